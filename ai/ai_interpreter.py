@@ -34,12 +34,102 @@
 
 
 import re
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Leading "(?:create|make)" group or literal word of an intent pattern
+_LEADING_WORDS = re.compile(r'\(\?:([a-z]+(?:\|[a-z]+)*)\)|([a-z]+)')
+_QUANTIFIERS = ('?', '*', '{')
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """Whether ``pattern`` has a ``|`` outside any group or character class"""
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            if pattern[i + 1:i + 2] == ']':
+                i += 1  # a leading ']' is literal
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return True
+        i += 1
+    return False
+
+def _leading_keywords(pattern: str) -> Optional[List[str]]:
+    """Words one of which must start every match of ``pattern``, if known"""
+    if _has_top_level_alternation(pattern):
+        return None  # another branch may start with anything
+    match = _LEADING_WORDS.match(pattern)
+    if not match:
+        return None
+    following = pattern[match.end():match.end() + 1]
+    if match.group(1):
+        return None if following in _QUANTIFIERS else match.group(1).split('|')
+    word = match.group(2)
+    if following in _QUANTIFIERS:
+        word = word[:-1]  # the quantifier only applies to the last letter
+    return [word] if word else None
+
+Intent = Tuple[int, str, str]  # (declaration index, pattern, command template)
+
+def _plan(cmd: str, arg: Optional[str]) -> Tuple[str, ...]:
+    if arg is not None:
+        return (cmd.format(arg.strip()),)  # use the full captured name
+    return (cmd,)
+
+class _IntentGroup:
+    """Several intents compiled into one alternation with a named group each.
+
+    Alternatives keep declaration order, so at any position the first
+    matching alternative is the highest-priority intent matching there.
+    """
+
+    def __init__(self, intents: List[Intent]):
+        alternatives = []
+        # outer group index -> (declaration index, arg count, template)
+        self.intents: Dict[int, Tuple[int, int, str]] = {}
+        group = 0
+        for index, pattern, cmd in intents:
+            group += 1
+            arg_count = re.compile(pattern).groups
+            self.intents[group] = (index, arg_count, cmd)
+            alternatives.append(f'(?P<i{index}>{pattern})')
+            group += arg_count
+        self.regex = re.compile('|'.join(alternatives))
+
+    def resolve(self, match) -> Tuple[int, Tuple[str, ...]]:
+        """(declaration index, plan) of the intent that produced ``match``"""
+        group = match.lastindex
+        index, arg_count, cmd = self.intents[group]
+        return index, _plan(cmd, match.group(group + 1) if arg_count else None)
 
 class AICommandInterpreter:
-    """AI-driven natural language command interpreter"""
+    """AI-driven natural language command interpreter
+
+    Intents are bucketed by the keyword they start with. One pass of a
+    keyword lookahead over the query finds every position where a keyword
+    starts, overlapping ones included (``eate`` inside ``create``), and the
+    bucket of each keyword found there is a single precompiled alternation
+    matched at that position, so the cost
+    does not grow with every registered pattern. Patterns without a known
+    leading keyword (a top-level ``|``, an optional first group) are tried
+    one by one. When several intents match, the one declared first wins, as
+    if every pattern were searched in order. Interpretations are memoized
+    per normalized query in a bounded LRU cache.
+    """
     
-    def __init__(self):
+    def __init__(self, cache_size: int = 1024):
         self.command_patterns = {
             # Create a folder: match full name after "create ... called"
             r'(?:create|make)\s+(?:a\s+)?(?:folder|directory)\s+(?:called\s+)?["\']?(.+?)["\']?$': 'mkdir "{}"',
@@ -50,19 +140,78 @@ class AICommandInterpreter:
             # List files
             r'(?:list|show)\s+(?:files|contents)': 'ls',
         }
+        self.direct_commands = frozenset(['ls', 'cd', 'mkdir', 'rmdir', 'rm', 'cp', 'mv', 'cat', 'touch'])
+        self.nl_indicators = ['create', 'make', 'delete', 'remove', 'show', 'list', 'display']
+        self.cache_size = cache_size
+        self.compile()
 
-    def interpret_natural_language(self, query: str) -> Optional[List[str]]:
-        query = query.lower().strip()
-        for pattern, cmd in self.command_patterns.items():
-            match = re.search(pattern, query)
+    def add_intent(self, pattern: str, command: str):
+        """Register an extra intent and recompile the matcher"""
+        self.command_patterns[pattern] = command
+        self.compile()
+
+    def compile(self):
+        """Build the keyword dispatch table and reset the interpretation cache"""
+        buckets: Dict[str, List[Intent]] = {}
+        fallback = []
+        for index, (pattern, cmd) in enumerate(self.command_patterns.items()):
+            keywords = _leading_keywords(pattern)
+            if keywords is None:
+                fallback.append((index, re.compile(pattern), cmd))
+            for keyword in keywords or ():
+                buckets.setdefault(keyword, []).append((index, pattern, cmd))
+
+        self._buckets = {keyword: _IntentGroup(intents) for keyword, intents in buckets.items()}
+        self._fallback = fallback
+        keywords = sorted(self._buckets, key=len, reverse=True)
+        self._keyword_re = re.compile(f"(?=({'|'.join(map(re.escape, keywords))}))") if keywords else None
+        # The lookahead reports the longest keyword at each position; any other
+        # keyword starting there is a prefix of it
+        self._nested = {keyword: [self._buckets[k] for k in keywords if keyword.startswith(k)]
+                        for keyword in keywords}
+        self._indicator_re = re.compile('|'.join(map(re.escape, self.nl_indicators)))
+        self._interpret_cached = lru_cache(maxsize=self.cache_size)(self._interpret)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return ' '.join(query.lower().split())
+
+    def _interpret(self, query: str) -> Optional[Tuple[str, ...]]:
+        best_index, best_plan = len(self.command_patterns), None
+        if self._keyword_re is not None:
+            for found in self._keyword_re.finditer(query):
+                pos = found.start()
+                for bucket in self._nested[found.group(1)]:
+                    match = bucket.regex.match(query, pos)
+                    if match:
+                        index, plan = bucket.resolve(match)
+                        if index < best_index:
+                            best_index, best_plan = index, plan
+        for index, regex, cmd in self._fallback:
+            if index >= best_index:
+                break
+            match = regex.search(query)
             if match:
-                return [cmd.format(match.group(1).strip())]  # use the full captured name
-        return None
+                return _plan(cmd, match.group(1) if regex.groups else None)
+        return best_plan
+
+    def interpret_natural_language(self, query: str) -> Optional[List[str]]:
+        plan = self._interpret_cached(self.normalize(query))
+        return list(plan) if plan is not None else None
+
+    def interpret_batch(self, queries: Iterable[str]) -> List[Optional[List[str]]]:
+        """Interpret many queries at once; repeated queries hit the cache"""
+        interpret = self._interpret_cached
+        normalize = self.normalize
+        results = []
+        for query in queries:
+            plan = interpret(normalize(query))
+            results.append(list(plan) if plan is not None else None)
+        return results
     
     def is_natural_language_query(self, input_text: str) -> bool:
-        direct_commands = ['ls', 'cd', 'mkdir', 'rmdir', 'rm', 'cp', 'mv', 'cat', 'touch']
-        first_word = input_text.strip().split()[0].lower() if input_text.strip() else ''
-        if first_word in direct_commands:
+        text = input_text.strip().lower()
+        first_word = text.split(None, 1)[0] if text else ''
+        if first_word in self.direct_commands:
             return False
-        nl_indicators = ['create', 'make', 'delete', 'remove', 'show', 'list', 'display']
-        return any(indicator in input_text.lower() for indicator in nl_indicators)
+        return self._indicator_re.search(text) is not None
@@ -0,0 +1,128 @@
+"""Micro-benchmark for AICommandInterpreter as the intent set grows.
+
+With ``--check`` it instead compares the interpreter against searching every
+pattern in order on random queries, including intents whose keyword sits
+inside another keyword, and fails (exit status 1) on the first difference.
+
+Usage: python benchmarks/bench_interpreter.py [--queries N] [--sizes 4,50,200,500] [--check]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.ai_interpreter import AICommandInterpreter
+
+VERBS = ['archive', 'compress', 'open', 'rename', 'sync', 'upload', 'download', 'inspect']
+
+def build_interpreter(intent_count: int, cache_size: int) -> AICommandInterpreter:
+    interpreter = AICommandInterpreter(cache_size=cache_size)
+    for n in range(max(0, intent_count - len(interpreter.command_patterns))):
+        verb = VERBS[n % len(VERBS)]
+        interpreter.command_patterns[rf'{verb}\s+(?:the\s+)?widget{n}\s+["\']?(.+?)["\']?$'] = f'{verb}{n} "{{}}"'
+    interpreter.compile()
+    return interpreter
+
+def build_queries(intent_count: int, count: int, distinct: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    templates = [
+        'create a folder called project{}',
+        'make a file named notes{}.txt',
+        'show files',
+        'what is the weather {}',
+    ]
+    pool = []
+    for i in range(distinct):
+        if intent_count > 4 and i % 2:
+            n = rng.randrange(intent_count - 4)
+            pool.append(f'{VERBS[n % len(VERBS)]} the widget{n} item{i}')
+        else:
+            pool.append(rng.choice(templates).format(i))
+    return [rng.choice(pool) for _ in range(count)]
+
+def naive_interpret(patterns: dict, query: str):
+    """The original per-pattern loop, kept as a reference point"""
+    query = query.lower().strip()
+    for pattern, cmd in patterns.items():
+        match = re.search(pattern, query)
+        if match:
+            return [cmd.format(match.group(1).strip())] if match.groups() else [cmd]
+    return None
+
+# Intents the keyword dispatch has to get right: a keyword inside another one,
+# one that is a prefix of another, a top-level alternation, an optional first group
+TRICKY_INTENTS = {
+    r'eate\s+(\w+)': 'echo eate {}',
+    r'cre\s+(\w+)': 'echo cre {}',
+    r'older\s+(\w+)': 'echo older {}',
+    r'files?\s+(\w+)': 'echo files {}',
+    r'show\s+it|display\s+it': 'echo display',
+    r'(?:the\s+)?widget(\d+)': 'echo widget {}',
+    r'make\s+it\s+(\w+)': 'echo make {}',
+}
+QUERY_WORDS = ['create', 'make', 'a', 'the', 'folder', 'file', 'files', 'named', 'called', 'show', 'list',
+               'display', 'delete', 'remove', 'directory', 'contents', 'it', 'eate', 'cre', 'recreate',
+               'older', 'widget3', 'widget12', 'x', 'notes.txt']
+
+def check(count: int, seed: int = 0) -> int:
+    """Compare against in-order search on ``count`` random queries; returns the number of differences"""
+    rng = random.Random(seed)
+    interpreter = build_interpreter(50, cache_size=0)
+    patterns = list(interpreter.command_patterns.items())
+    for pattern, cmd in TRICKY_INTENTS.items():
+        patterns.insert(rng.randrange(len(patterns) + 1), (pattern, cmd))
+    interpreter.command_patterns = dict(patterns)
+    interpreter.compile()
+    differences = 0
+    for _ in range(count):
+        query = ' '.join(rng.choice(QUERY_WORDS) for _ in range(rng.randint(1, 6)))
+        expected = naive_interpret(interpreter.command_patterns, query)
+        got = interpreter.interpret_natural_language(query)
+        if got != expected:
+            differences += 1
+            if differences <= 10:
+                print(f"❌ {query!r}: got {got}, in-order search gives {expected}")
+    return differences
+
+def throughput(func, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        func(query)
+    return len(queries) / (time.perf_counter() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, default=20000)
+    parser.add_argument('--distinct', type=int, default=2000)
+    parser.add_argument('--sizes', default='4,50,200,500')
+    parser.add_argument('--check', action='store_true', help="compare results with in-order search instead")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        differences = check(args.queries)
+        if differences:
+            print(f"❌ {differences} of {args.queries:,} queries differ from in-order search")
+            return 1
+        print(f"✅ {args.queries:,} random queries match in-order search")
+        return 0
+
+    print(f"{'INTENTS':>8} {'NAIVE q/s':>12} {'COMPILED q/s':>14} {'CACHED q/s':>12} {'BATCH q/s':>12}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        queries = build_queries(size, args.queries, args.distinct)
+        uncached = build_interpreter(size, cache_size=0)
+        cached = build_interpreter(size, cache_size=4096)
+        naive = throughput(lambda q: naive_interpret(uncached.command_patterns, q), queries[:max(1, args.queries // 10)])
+        compiled = throughput(uncached.interpret_natural_language, queries)
+        warm = throughput(cached.interpret_natural_language, queries)
+        start = time.perf_counter()
+        cached.interpret_batch(queries)
+        batch = len(queries) / (time.perf_counter() - start)
+        print(f"{size:>8} {naive:>12,.0f} {compiled:>14,.0f} {warm:>12,.0f} {batch:>12,.0f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
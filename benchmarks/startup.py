@@ -0,0 +1,65 @@
+"""Startup-time check: time from launching the terminal to its first prompt.
+
+Runs ``PythonTerminal()`` plus ``get_prompt()`` in fresh interpreters and
+fails (exit status 1) if the median exceeds the target or if startup imported
+a module that should only load on first use.
+
+Usage: python benchmarks/startup.py [--target-ms 50] [--runs 7]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must stay unloaded until a command needs them
+LAZY_MODULES = ['psutil', 'commands.core_commands', 'commands.pipeline', 'subprocess', 'asyncio', 'commands.jobs']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from terminal import PythonTerminal
+terminal = PythonTerminal()
+terminal.get_prompt()
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+def measure(runs: int) -> dict:
+    samples, loaded = [], set()
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home)
+        for _ in range(runs):
+            result = subprocess.run([sys.executable, '-c', PROBE % (LAZY_MODULES,)], cwd=ROOT, env=env,
+                                    capture_output=True, text=True, check=True)
+            data = json.loads(result.stdout.strip().splitlines()[-1])
+            samples.append(data['ms'])
+            loaded.update(data['loaded'])
+    return {'median_ms': statistics.median(samples), 'max_ms': max(samples), 'eager_modules': sorted(loaded)}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target-ms', type=float, default=50.0)
+    parser.add_argument('--runs', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs)
+    print(f"time to first prompt: median {result['median_ms']:.1f} ms, max {result['max_ms']:.1f} ms "
+          f"(target {args.target_ms:.0f} ms)")
+    ok = True
+    if result['median_ms'] > args.target_ms:
+        print("❌ startup is over target")
+        ok = False
+    if result['eager_modules']:
+        print(f"❌ loaded at startup: {', '.join(result['eager_modules'])}")
+        ok = False
+    if ok:
+        print("✅ startup within target")
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,411 @@
+"""Benchmark suite for the terminal's hot paths.
+
+Builds synthetic fixtures (a 100k-line history file, directories with 10^5
+entries, a large file, a deep tree and a query corpus), times each case and
+writes the results as JSON. The run fails (exit status 1) when a case misses
+its per-operation target, or, if a baseline exists, when a case got slower
+than the baseline by more than the threshold. Everything runs offline;
+fixtures are built with a fixed seed so runs are comparable.
+
+Usage: python benchmarks/suite.py [--scale 1.0] [--only PATTERN] [--repeat 5]
+                                  [--fixtures DIR] [--output results.json]
+                                  [--baseline benchmarks/baseline.json] [--threshold 0.25]
+                                  [--min-delta-ms 5] [--save-baseline]
+"""
+import argparse
+import contextlib
+import fnmatch
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# Fixture sizes at --scale 1.0
+SIZES = {
+    'history_lines': 100_000,
+    'dir_entries': 100_000,
+    'large_file_mb': 256,
+    'tree_depth': 6,
+    'tree_fanout': 3,
+    'tree_files_per_dir': 8,
+    'tree_file_size': 4096,
+    'queries': 20_000,
+}
+UNSCALED = {'tree_depth', 'tree_file_size'}
+
+WORDS = ['build', 'test', 'deploy', 'src', 'docs', 'report', 'backup', 'config', 'data', 'logs',
+         'release', 'notes', 'project', 'image', 'video', 'archive', 'draft', 'final', 'main', 'temp']
+
+class Case:
+    """One timed operation; ``setup`` runs untimed before every repetition.
+
+    ``target_s`` is the most the median may spend per op; missing it fails
+    the run whatever the baseline says.
+    """
+
+    def __init__(self, name: str, run: Callable[[], object], ops: int = 1,
+                 setup: Optional[Callable[[], None]] = None, target_s: Optional[float] = None):
+        self.name = name
+        self.run = run
+        self.ops = ops
+        self.setup = setup
+        self.target_s = target_s
+
+    def measure(self, repeat: int) -> dict:
+        samples = []
+        for _ in range(repeat):
+            if self.setup:
+                self.setup()
+            start = time.perf_counter()
+            self.run()
+            samples.append(time.perf_counter() - start)
+        median = statistics.median(samples)
+        result = {'median_s': median, 'min_s': min(samples), 'ops': self.ops,
+                  'ops_per_s': self.ops / median if median else None}
+        if self.target_s is not None:
+            result['target_s'] = self.target_s
+        return result
+
+class Fixtures:
+    """Synthetic inputs, built once per parameter set and reused from ``root``"""
+
+    def __init__(self, root: str, scale: float, seed: int = 0):
+        self.root = root
+        self.sizes = {k: v if k in UNSCALED else max(1, int(v * scale)) for k, v in SIZES.items()}
+        self.seed = seed
+        self.home = os.path.join(root, 'home')
+        self.history_file = os.path.join(self.home, '.terminal_history')
+        self.big_dir = os.path.join(root, 'big_dir')
+        self.large_file = os.path.join(root, 'large.bin')
+        self.tree = os.path.join(root, 'tree')
+        self.scratch = os.path.join(root, 'scratch')
+
+    def build(self):
+        marker = os.path.join(self.root, 'fixtures.json')
+        params = {'sizes': self.sizes, 'seed': self.seed}
+        try:
+            with open(marker) as f:
+                if json.load(f) == params:
+                    return
+        except (OSError, ValueError):
+            pass
+        for path in (self.home, self.big_dir, self.tree, self.scratch):
+            shutil.rmtree(path, ignore_errors=True)
+        rng = random.Random(self.seed)
+        self._build_history(rng)
+        self._build_big_dir(rng)
+        self._build_large_file(rng)
+        self._build_tree(self.tree, self.sizes['tree_depth'])
+        os.makedirs(self.scratch, exist_ok=True)
+        with open(marker, 'w') as f:
+            json.dump(params, f)
+
+    def command(self, rng: random.Random) -> str:
+        kind = rng.randrange(6)
+        a, b = rng.choice(WORDS), rng.choice(WORDS)
+        n = int(rng.paretovariate(1.2))  # a few commands repeat a lot, most are rare
+        if kind == 0:
+            return f"cd {a}/{b}{n}"
+        if kind == 1:
+            return f"ls -l {a}"
+        if kind == 2:
+            return f"git commit -m '{a} {b} {n}'"
+        if kind == 3:
+            return f"cp -r {a} {b}{n}"
+        if kind == 4:
+            return f"python {a}_{b}.py --run {n}"
+        return f"grep -r {a} {b}"
+
+    def _build_history(self, rng: random.Random):
+        os.makedirs(self.home, exist_ok=True)
+        with open(self.history_file, 'w') as f:
+            f.writelines(self.command(rng) + '\n' for _ in range(self.sizes['history_lines']))
+
+    def _build_big_dir(self, rng: random.Random):
+        os.makedirs(self.big_dir)
+        for i in range(self.sizes['dir_entries']):
+            name = f"{rng.choice(WORDS)}_{i:06d}"
+            if i % 50 == 0:
+                os.mkdir(os.path.join(self.big_dir, name))
+            else:
+                open(os.path.join(self.big_dir, name + '.txt'), 'w').close()
+
+    def _build_large_file(self, rng: random.Random):
+        line_block = ''.join(f"{i:08d} {' '.join(rng.choices(WORDS, k=10))}\n" for i in range(16384)).encode()
+        target = self.sizes['large_file_mb'] * 1024 * 1024
+        with open(self.large_file, 'wb') as f:
+            written = 0
+            while written < target:
+                chunk = line_block[:target - written]
+                f.write(chunk)
+                written += len(chunk)
+
+    def _build_tree(self, path: str, depth: int):
+        os.makedirs(path)
+        payload = b'x' * self.sizes['tree_file_size']
+        for i in range(self.sizes['tree_files_per_dir']):
+            with open(os.path.join(path, f"file{i}.dat"), 'wb') as f:
+                f.write(payload)
+        if depth > 0:
+            for i in range(self.sizes['tree_fanout']):
+                self._build_tree(os.path.join(path, f"dir{i}"), depth - 1)
+
+    def queries(self) -> List[str]:
+        rng = random.Random(self.seed)
+        templates = [
+            'create a folder called {}', 'make a directory named {}', 'create a file called {}.txt',
+            'delete the file {}.txt', 'remove folder {}', 'show files', 'list all files',
+            'show running processes', 'display system information', 'go to {}',
+            'what is the weather in {}', 'please tidy up my {} folder',
+        ]
+        pool = [rng.choice(templates).format(f"{rng.choice(WORDS)}{i}") for i in range(2000)]
+        return [rng.choice(pool) for _ in range(self.sizes['queries'])]
+
+@contextlib.contextmanager
+def quiet():
+    """Send builtin output to /dev/null (text and binary)"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+@contextlib.contextmanager
+def drained():
+    """Send builtin output into a pipe that a thread reads and discards.
+
+    Writes to /dev/null cost nothing, which would hide the cost of actually
+    moving bytes; a pipe makes ``cat`` do the copying it does in real use.
+    """
+    read_fd, write_fd = os.pipe()
+
+    def drain():
+        with os.fdopen(read_fd, 'rb', buffering=0) as pipe:
+            while pipe.read(1024 * 1024):
+                pass
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    with os.fdopen(write_fd, 'w') as out, contextlib.redirect_stdout(out):
+        yield
+    reader.join()
+
+def build_cases(fx: Fixtures) -> List[Case]:
+    from ai.ai_interpreter import AICommandInterpreter
+    from commands.core_commands import CommandMethods
+    from completion.auto_completer import EnhancedAutoCompleter
+    from history.command_history import EnhancedCommandHistory
+    from terminal import PythonTerminal
+
+    os.environ['HOME'] = fx.home
+    cases: List[Case] = []
+
+    # History
+    def load_history():
+        history = EnhancedCommandHistory(persist=True)
+        len(history.commands)
+        history.close()
+    cases.append(Case('history.load', load_history))
+
+    history = EnhancedCommandHistory()
+    rng = random.Random(fx.seed + 1)
+    new_commands = [fx.command(rng) for _ in range(10_000)]
+    cases.append(Case('history.index_build', lambda: EnhancedCommandHistory().index))
+
+    add_file = '.terminal_history_add'
+    def reset_add():
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(fx.home, add_file))
+    def add_commands():
+        target = EnhancedCommandHistory(history_file=add_file)
+        target.index  # keep the index live, as an interactive session does
+        for command in new_commands:
+            target.add_command(command)
+        target.close()
+    cases.append(Case('history.add_command', add_commands, ops=len(new_commands), setup=reset_add))
+
+    searches = [rng.choice(WORDS)[:rng.randint(3, 5)] for _ in range(1000)]
+    history.index
+    cases.append(Case('history.search', lambda: [history.search_history(q, 20) for q in searches],
+                      ops=len(searches)))
+    partials = [fx.command(rng)[:rng.randint(2, 8)] for _ in range(10_000)]
+    cases.append(Case('history.suggestions', lambda: [history.get_suggestions(p) for p in partials],
+                      ops=len(partials)))
+
+    # The default ring buffer only holds 10k commands; these index every fixture line
+    lines = fx.sizes['history_lines']
+    cases.append(Case('history.index_build_full',
+                      lambda: EnhancedCommandHistory(max_entries=lines).index))
+    full = EnhancedCommandHistory(max_entries=lines)
+    full.index
+    cases.append(Case('history.search_full', lambda: [full.search_history(q, 20) for q in searches],
+                      ops=len(searches), target_s=0.001))
+    cases.append(Case('history.suggestions_full', lambda: [full.get_suggestions(p) for p in partials],
+                      ops=len(partials), target_s=0.001))
+
+    # Completion
+    terminal = PythonTerminal(interactive=False)
+    terminal.current_dir = fx.big_dir
+    prefixes = [f"{w}_0" for w in WORDS[:10]] + ['', 'b', 're']
+    def complete_cold():
+        completer = EnhancedAutoCompleter(terminal)
+        for prefix in prefixes:
+            completer.get_completions(prefix, f"ls {prefix}")
+    cases.append(Case('completion.cold', complete_cold, ops=len(prefixes)))
+    warm = EnhancedAutoCompleter(terminal)
+    warm.get_completions('', 'ls ')
+    cases.append(Case('completion.warm', lambda: [warm.get_completions(p, f"ls {p}") for p in prefixes],
+                      ops=len(prefixes)))
+    cases.append(Case('completion.command', lambda: [warm.get_completions(w[:2], w[:2]) for w in WORDS],
+                      ops=len(WORDS)))
+
+    # Listing
+    def ls(*args):
+        with quiet():
+            CommandMethods.cmd_ls(fx.root, [*args, fx.big_dir])
+    cases.append(Case('ls', ls, ops=fx.sizes['dir_entries']))
+    cases.append(Case('ls.long', lambda: ls('-l'), ops=fx.sizes['dir_entries']))
+    cases.append(Case('ls.unsorted', lambda: ls('-U'), ops=fx.sizes['dir_entries']))
+
+    # File ops
+    def cat():
+        with drained():
+            CommandMethods.cmd_cat(fx.root, [fx.large_file])
+    cases.append(Case('cat', cat, ops=fx.sizes['large_file_mb']))
+
+    copy_dest = os.path.join(fx.scratch, 'copy')
+    def reset_copy():
+        shutil.rmtree(copy_dest, ignore_errors=True)
+    def cp():
+        with quiet():
+            CommandMethods.cmd_cp(fx.root, ['-r', fx.tree, copy_dest])
+    tree_files = sum(len(files) for _, _, files in os.walk(fx.tree))
+    cases.append(Case('cp.tree', cp, ops=tree_files, setup=reset_copy))
+
+    doomed = os.path.join(fx.scratch, 'doomed')
+    def make_doomed():
+        shutil.rmtree(doomed, ignore_errors=True)
+        shutil.copytree(fx.tree, doomed)
+    def rm():
+        with quiet():
+            CommandMethods.cmd_rm(fx.root, ['-r', doomed])
+    cases.append(Case('rm.tree', rm, ops=tree_files, setup=make_doomed))
+
+    # Interpreter
+    queries = fx.queries()
+    cold = AICommandInterpreter(cache_size=0)
+    cases.append(Case('interpreter.uncached', lambda: [cold.interpret_natural_language(q) for q in queries],
+                      ops=len(queries)))
+    cached = AICommandInterpreter()
+    cases.append(Case('interpreter.cached', lambda: [cached.interpret_natural_language(q) for q in queries],
+                      ops=len(queries)))
+    cases.append(Case('interpreter.detect', lambda: [cached.is_natural_language_query(q) for q in queries],
+                      ops=len(queries)))
+    return cases
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float,
+            min_delta: float = 0.005) -> List[str]:
+    """Print a comparison table and return the names of regressed cases.
+
+    Cases are compared on their best time, which is the least disturbed by
+    other load on the machine, and a slowdown only counts if it is also
+    larger than ``min_delta`` seconds, so sub-millisecond jitter can't fail
+    a run.
+    """
+    regressions = []
+    print(f"\n{'CASE':<24} {'BASELINE':>12} {'CURRENT':>12} {'CHANGE':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<24} {'-':>12} {result['min_s'] * 1000:>10.1f}ms {'new':>9}")
+            continue
+        change = result['min_s'] / base['min_s'] - 1 if base['min_s'] else 0.0
+        flag = ''
+        if change > threshold and result['min_s'] - base['min_s'] > min_delta:
+            regressions.append(name)
+            flag = ' ❌'
+        print(f"{name:<24} {base['min_s'] * 1000:>10.1f}ms {result['min_s'] * 1000:>10.1f}ms "
+              f"{change:>+8.0%}{flag}")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply fixture sizes (e.g. 0.1 for a quick run)")
+    parser.add_argument('--only', help="run cases matching this glob, e.g. 'history.*'")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--fixtures', help="directory to build fixtures in and reuse across runs")
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        root = args.fixtures or stack.enter_context(tempfile.TemporaryDirectory(prefix='terminal-bench-'))
+        os.makedirs(root, exist_ok=True)
+        fx = Fixtures(os.path.abspath(root), args.scale)
+        start = time.perf_counter()
+        fx.build()
+        print(f"fixtures ready in {time.perf_counter() - start:.1f}s ({root})")
+
+        results: Dict[str, dict] = {}
+        print(f"{'CASE':<24} {'MEDIAN':>12} {'OPS/S':>14}")
+        for case in build_cases(fx):
+            if args.only and not fnmatch.fnmatch(case.name, args.only):
+                continue
+            result = results[case.name] = case.measure(args.repeat)
+            rate = f"{result['ops_per_s']:,.0f}" if result['ops_per_s'] else '-'
+            print(f"{case.name:<24} {result['median_s'] * 1000:>10.1f}ms {rate:>14}")
+
+    missed = [name for name, result in results.items()
+              if 'target_s' in result and result['median_s'] / result['ops'] > result['target_s']]
+    for name in missed:
+        result = results[name]
+        print(f"❌ {name}: {result['median_s'] / result['ops'] * 1000:.3f} ms per op, "
+              f"target {result['target_s'] * 1000:.3f} ms")
+    status = 1 if missed else 0
+
+    report = {
+        'meta': {'scale': args.scale, 'repeat': args.repeat, 'python': platform.python_version(),
+                 'platform': platform.platform(), 'cpus': os.cpu_count(), 'timestamp': time.time()},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ baseline saved to {args.baseline}")
+        return status
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except OSError:
+        print(f"\nno baseline at {args.baseline}; run with --save-baseline to create one")
+        return status
+    if baseline['meta'].get('scale') != args.scale:
+        print(f"\n⚠️ baseline was recorded at scale {baseline['meta'].get('scale')}, not {args.scale}; skipping comparison")
+        return status
+    regressions = compare(results, baseline['results'], args.threshold, args.min_delta_ms / 1000)
+    if regressions:
+        print(f"\n❌ {len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}: "
+              f"{', '.join(regressions)}")
+        return 1
+    print(f"\n✅ no regressions over {args.threshold:.0%}")
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import List
+
+POLL_INTERVAL = 0.1
+
+_local = threading.local()
+
+def cancel_event() -> threading.Event:
+    """Event that is set when the command running on this thread should stop.
+
+    Background jobs install theirs with :func:`cancel_scope` so ``kill %N``
+    can reach a builtin; elsewhere each caller gets a fresh event, which
+    only the caller itself sets (e.g. on Ctrl+C).
+    """
+    return getattr(_local, 'event', None) or threading.Event()
+
+@contextmanager
+def cancel_scope(event: threading.Event):
+    """Make ``event`` this thread's :func:`cancel_event` for the duration"""
+    saved = getattr(_local, 'event', None)
+    _local.event = event
+    try:
+        yield
+    finally:
+        _local.event = saved
+
+def put(tasks: queue.Queue, item, cancel: threading.Event) -> bool:
+    """Queue ``item``, waiting for room until ``cancel`` is set; returns whether it was queued"""
+    while not cancel.is_set():
+        try:
+            tasks.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def stop_workers(tasks: queue.Queue, threads: List[threading.Thread], cancel: threading.Event):
+    """Send every worker its ``None`` sentinel and wait for them to finish.
+
+    Waits are short and repeated, so Ctrl+C is seen at once: it sets
+    ``cancel``, which makes the workers skip the rest of the queue, and is
+    raised again once they have all stopped.
+    """
+    interrupted = False
+    for _ in threads:
+        while True:
+            try:
+                tasks.put(None, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+            except KeyboardInterrupt:
+                cancel.set()
+                interrupted = True
+    for thread in threads:
+        while thread.is_alive():
+            try:
+                thread.join(POLL_INTERVAL)
+            except KeyboardInterrupt:
+                cancel.set()
+                interrupted = True
+    if interrupted:
+        raise KeyboardInterrupt
@@ -0,0 +1,205 @@
+import errno
+import os
+import queue
+import shutil
+import stat
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from commands import cancel as cancellation
+from commands.progress import ProgressLine
+
+ZERO_COPY_CHUNK = 64 * 1024 * 1024
+_UNSUPPORTED = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF)
+
+class CopyStats:
+    def __init__(self):
+        self.copied = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.errors: List[str] = []
+        self.elapsed = 0.0
+        self.interrupted = False
+
+class CopyEngine:
+    """Parallel file and tree copier.
+
+    Directories are walked with ``os.scandir`` on the calling thread while a
+    pool of workers copies files from a bounded queue. Files of at least
+    ``zero_copy_threshold`` bytes are copied inside the kernel with
+    ``os.copy_file_range`` (or ``os.sendfile``). With ``resume`` on, files whose
+    destination already has the same size and mtime are skipped, so an
+    interrupted copy picks up where it stopped.
+
+    Setting ``cancel`` (by default the thread's
+    :func:`~commands.cancel.cancel_event`, which ``kill %N`` sets for a
+    background job) stops the walk and the workers between files and
+    between chunks of large files.
+    """
+
+    def __init__(self, workers: Optional[int] = None, zero_copy_threshold: int = 1024 * 1024,
+                 resume: bool = True, progress: bool = True, cancel: Optional[threading.Event] = None):
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.zero_copy_threshold = zero_copy_threshold
+        self.resume = resume
+        self.progress = progress
+        self.cancel = cancel if cancel is not None else cancellation.cancel_event()
+
+    def copy(self, src: str, dest: str) -> CopyStats:
+        """Copy a file to ``dest``, or a directory tree so that ``dest`` mirrors ``src``"""
+        stats = CopyStats()
+        started = time.monotonic()
+        progress = ProgressLine("cp") if self.progress else None
+        if progress:
+            progress.start()
+        try:
+            if os.path.isdir(src) and not os.path.islink(src):
+                self._copy_tree(src, dest, stats, progress)
+            else:
+                self._copy_one(src, dest, os.stat(src), stats, progress)
+        except KeyboardInterrupt:
+            self.cancel.set()
+        finally:
+            if progress:
+                progress.finish()
+            stats.elapsed = time.monotonic() - started
+        stats.interrupted = self.cancel.is_set()
+        return stats
+
+    def _copy_tree(self, src: str, dest: str, stats: CopyStats, progress: Optional[ProgressLine]):
+        tasks: queue.Queue = queue.Queue(maxsize=self.workers * 64)
+        cancelled = self.cancel
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                task = tasks.get()
+                if task is None:
+                    return
+                if cancelled.is_set():
+                    continue
+                file_src, file_dest, st = task
+                local = CopyStats()
+                self._copy_one(file_src, file_dest, st, local, progress)
+                with lock:
+                    stats.copied += local.copied
+                    stats.skipped += local.skipped
+                    stats.bytes += local.bytes
+                    stats.errors.extend(local.errors)
+
+        threads = [threading.Thread(target=worker, name=f"cp-{i}", daemon=True) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        directories: List[Tuple[str, str]] = []
+        total_files = total_bytes = 0
+        try:
+            stack = [(src, dest)]
+            while stack and not cancelled.is_set():
+                src_dir, dest_dir = stack.pop()
+                try:
+                    os.makedirs(dest_dir, exist_ok=True)
+                    directories.append((src_dir, dest_dir))
+                    with os.scandir(src_dir) as entries:
+                        for entry in entries:
+                            entry_dest = os.path.join(dest_dir, entry.name)
+                            if entry.is_symlink():
+                                self._copy_symlink(entry.path, entry_dest, stats)
+                            elif entry.is_dir():
+                                stack.append((entry.path, entry_dest))
+                            else:
+                                st = entry.stat()
+                                total_files += 1
+                                total_bytes += st.st_size
+                                if not cancellation.put(tasks, (entry.path, entry_dest, st), cancelled):
+                                    break
+                except OSError as e:
+                    stats.errors.append(f"{src_dir}: {e.strerror or e}")
+            if progress:
+                progress.set_totals(total_files, total_bytes)
+        except KeyboardInterrupt:
+            cancelled.set()
+            raise
+        finally:
+            cancellation.stop_workers(tasks, threads, cancelled)
+
+        # Directory times change as files land in them, so apply them last
+        for src_dir, dest_dir in reversed(directories):
+            try:
+                shutil.copystat(src_dir, dest_dir)
+            except OSError:
+                pass
+
+    def _copy_symlink(self, src: str, dest: str, stats: CopyStats):
+        try:
+            target = os.readlink(src)
+            if os.path.islink(dest):
+                if os.readlink(dest) == target:
+                    stats.skipped += 1
+                    return
+                os.remove(dest)
+            os.symlink(target, dest)
+            stats.copied += 1
+        except OSError as e:
+            stats.errors.append(f"{src}: {e.strerror or e}")
+
+    def _copy_one(self, src: str, dest: str, st: os.stat_result, stats: CopyStats,
+                  progress: Optional[ProgressLine]):
+        try:
+            if self.resume and self._up_to_date(dest, st):
+                stats.skipped += 1
+                if progress:
+                    progress.add(1, st.st_size)
+                return
+            if st.st_size >= self.zero_copy_threshold and stat.S_ISREG(st.st_mode):
+                self._zero_copy(src, dest, st.st_size, progress)
+                if self.cancel.is_set():
+                    return  # maybe cut short; without copystat its mtime differs, so resume redoes it
+            else:
+                shutil.copyfile(src, dest)
+                if progress:
+                    progress.add(0, st.st_size)
+            shutil.copystat(src, dest)
+            stats.copied += 1
+            stats.bytes += st.st_size
+            if progress:
+                progress.add(1, 0)
+        except OSError as e:
+            stats.errors.append(f"{src}: {e.strerror or e}")
+
+    @staticmethod
+    def _up_to_date(dest: str, st: os.stat_result) -> bool:
+        try:
+            existing = os.stat(dest)
+        except OSError:
+            return False
+        return existing.st_size == st.st_size and int(existing.st_mtime) == int(st.st_mtime)
+
+    def _zero_copy(self, src: str, dest: str, size: int, progress: Optional[ProgressLine]):
+        """Copy inside the kernel, falling back to a buffered copy if unsupported"""
+        with open(src, 'rb') as fsrc, open(dest, 'wb') as fdst:
+            in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+            offset = 0
+            for method in ('copy_file_range', 'sendfile'):
+                if not hasattr(os, method):
+                    continue
+                try:
+                    while offset < size and not self.cancel.is_set():
+                        count = min(ZERO_COPY_CHUNK, size - offset)
+                        if method == 'copy_file_range':
+                            sent = os.copy_file_range(in_fd, out_fd, count, offset, offset)
+                        else:
+                            sent = os.sendfile(out_fd, in_fd, offset, count)
+                        if sent == 0:
+                            break
+                        offset += sent
+                        if progress:
+                            progress.add(0, sent)
+                    return
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED or offset:
+                        raise
+            shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+            if progress:
+                progress.add(0, size)
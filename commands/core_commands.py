@@ -1,8 +1,47 @@
 import os
 import shutil
+import sys
 from pathlib import Path
 from datetime import datetime
-import psutil
+import heapq
+from commands.progress import format_bytes
+from commands.file_stream import binary_stdout, copy_stream, follow, head_lines, stream_file, tail_lines
+
+def _parse_line_args(name, args, allow_follow=False):
+    """Parse ``-n N`` / ``-N`` / ``-f`` for head and tail"""
+    count, follow_mode, files = 10, False, []
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg == '-n' and i + 1 < len(args):
+                count = int(args[i + 1])
+                i += 1
+            elif arg.startswith('-n') and len(arg) > 2:
+                count = int(arg[2:])
+            elif arg == '-f' and allow_follow:
+                follow_mode = True
+            elif arg.startswith('-') and arg[1:].isdigit():
+                count = int(arg[1:])
+            else:
+                files.append(arg)
+            i += 1
+    except ValueError:
+        print(f"{name}: invalid number of lines")
+        return None
+    if not files:
+        files = ['-']
+    if follow_mode and len(files) > 1:
+        print(f"{name}: -f follows a single file")
+        return None
+    return count, follow_mode, files
+
+def _job_arg(jobs, name, args):
+    """The job named by ``args[0]`` (``%N``), or the current job"""
+    job = jobs.find(args[0]) if args else jobs.current()
+    if job is None:
+        print(f"{name}: {args[0] if args else 'current'}: no such job")
+    return job
 
 class CommandMethods:
     """Builtin command implementations for a Python terminal."""
@@ -14,22 +53,49 @@ class CommandMethods:
 
     @staticmethod
     def cmd_ls(current_dir, args):
-        """List directory contents"""
-        path = args[0] if args else current_dir
-        path = os.path.abspath(path)
-        try:
-            if not os.path.exists(path):
-                print(f"ls: {path}: No such file or directory")
-                return
-            items = os.listdir(path)
-            for item in sorted(items):
-                print(item, end='  ')
-            if items:
-                print()
-        except PermissionError:
-            print(f"ls: {path}: Permission denied")
-        except Exception as e:
-            print(f"ls: {e}")
+        """List directory contents (ls [-laRStUr] [--json] [path...])"""
+        from commands.listing import DirectoryLister
+        json_output = '--json' in args
+        args = [a for a in args if a != '--json']
+        err = sys.stderr if json_output else sys.stdout
+        flags = ''.join(a[1:] for a in args if a.startswith('-') and len(a) > 1)
+        unknown = set(flags) - set('laRStUr')
+        if unknown:
+            print(f"ls: invalid option -- '{sorted(unknown)[0]}'", file=err)
+            return 1
+        sort = 'name'
+        if 'S' in flags:
+            sort = 'size'
+        elif 't' in flags:
+            sort = 'time'
+        if 'U' in flags:
+            sort = None
+        lister = DirectoryLister(long='l' in flags, show_all='a' in flags, recursive='R' in flags,
+                                 sort=sort, reverse='r' in flags, json_output=json_output)
+        paths = [a for a in args if not a.startswith('-') or a == '-'] or [current_dir]
+        status = 0
+        for path in paths:
+            path = os.path.abspath(os.path.join(current_dir, path))
+            try:
+                if not os.path.lexists(path):
+                    lister.flush()
+                    print(f"ls: {path}: No such file or directory", file=err)
+                    status = 1
+                elif os.path.isdir(path):
+                    lister.list_dir(path, header=len(paths) > 1)
+                else:
+                    lister.list_file(path, os.path.basename(path))
+                    lister.flush()
+            except PermissionError:
+                print(f"ls: {path}: Permission denied", file=err)
+                status = 1
+            except BrokenPipeError:
+                raise
+            except Exception as e:
+                print(f"ls: {e}", file=err)
+                status = 1
+        lister.finish()
+        return status
 
     @staticmethod
     def cmd_cd(current_dir, args):
@@ -48,7 +114,8 @@ class CommandMethods:
         """Create directories"""
         if not args:
             print("mkdir: missing operand")
-            return
+            return 1
+        status = 0
         for dirname in args:
             path = os.path.abspath(os.path.join(current_dir, dirname))
             try:
@@ -56,15 +123,19 @@ class CommandMethods:
                 print(f"✅ Created directory: {path}")
             except FileExistsError:
                 print(f"mkdir: {path} already exists")
+                status = 1
             except Exception as e:
                 print(f"mkdir: {e}")
+                status = 1
+        return status
 
     @staticmethod
     def cmd_rmdir(current_dir, args):
         """Remove empty directories"""
         if not args:
             print("rmdir: missing operand")
-            return
+            return 1
+        status = 0
         for dirname in args:
             path = os.path.abspath(os.path.join(current_dir, dirname))
             try:
@@ -72,33 +143,69 @@ class CommandMethods:
                 print(f"✅ Removed directory: {path}")
             except OSError as e:
                 print(f"rmdir: {path}: {e}")
+                status = 1
+        return status
 
     @staticmethod
     def cmd_rm(current_dir, args):
-        """Remove files or directories"""
-        if not args:
+        """Remove files or directories (rm [-r] [-f] [-n|--dry-run] path...)"""
+        from commands.delete_engine import DeleteEngine
+        flags = [a for a in args if a.startswith('-')]
+        operands = [a for a in args if not a.startswith('-')]
+        dry_run = '--dry-run' in flags or any('n' in f for f in flags if not f.startswith('--'))
+        unknown = [f for f in flags if f != '--dry-run' and (f.startswith('--') or set(f[1:]) - set('rRfn'))]
+        if unknown:
+            print(f"rm: unknown option {unknown[0]}")
+            return 1
+        if not operands:
             print("rm: missing operand")
-            return
-        for filename in args:
+            return 1
+        engine = DeleteEngine()
+        status = 0
+        for filename in operands:
             path = os.path.abspath(os.path.join(current_dir, filename))
             try:
-                if os.path.isfile(path):
-                    os.remove(path)
-                    print(f"✅ Removed file: {path}")
-                elif os.path.isdir(path):
-                    shutil.rmtree(path)
-                    print(f"✅ Removed directory: {path}")
+                if os.path.isdir(path) and not os.path.islink(path):
+                    stats = engine.count(path) if dry_run else engine.delete(path)
+                    for error in stats.errors[:10]:
+                        print(f"rm: {error}")
+                    if len(stats.errors) > 10:
+                        print(f"rm: ... {len(stats.errors) - 10} more errors")
+                    summary = f"{stats.files:,} files, {stats.dirs:,} directories, {format_bytes(stats.bytes)}"
+                    if stats.interrupted:
+                        print(f"⚠️ Interrupted: {path} ({summary} so far)")
+                        return 130
+                    elif stats.errors:
+                        verb = "Could not fully scan" if dry_run else "Could not fully remove"
+                        print(f"⚠️ {verb} directory: {path} ({len(stats.errors)} errors; {summary})")
+                        status = 1
+                    elif dry_run:
+                        print(f"🔍 Would remove directory: {path} ({summary})")
+                    else:
+                        print(f"✅ Removed directory: {path} ({summary} in {stats.elapsed:.1f}s)")
+                elif os.path.lexists(path):
+                    if dry_run:
+                        print(f"🔍 Would remove file: {path} ({format_bytes(os.lstat(path).st_size)})")
+                    else:
+                        os.remove(path)
+                        print(f"✅ Removed file: {path}")
                 else:
                     print(f"rm: {path}: No such file or directory")
+                    status = 1
             except Exception as e:
                 print(f"rm: {e}")
+                status = 1
+        if dry_run:
+            print("💡 Nothing was deleted; run again without -n/--dry-run to remove")
+        return status
 
     @staticmethod
     def cmd_touch(current_dir, args):
         """Create empty files or update timestamps"""
         if not args:
             print("touch: missing operand")
-            return
+            return 1
+        status = 0
         for filename in args:
             path = os.path.abspath(os.path.join(current_dir, filename))
             try:
@@ -106,22 +213,188 @@ class CommandMethods:
                 print(f"✅ Created/updated file: {path}")
             except Exception as e:
                 print(f"touch: {e}")
+                status = 1
+        return status
 
     @staticmethod
     def cmd_cat(current_dir, args):
-        """Display file contents"""
-        if not args:
-            print("cat: missing file operand")
-            return
-        for filename in args:
+        """Display file contents (standard input when no file or '-' is given)"""
+        out = binary_stdout()
+        status = 0
+        for filename in args or ['-']:
             path = os.path.abspath(os.path.join(current_dir, filename))
             try:
-                with open(path, 'r') as f:
-                    print(f.read(), end='')
+                if filename == '-':
+                    copy_stream(sys.stdin.buffer, out)
+                    out.flush()
+                elif os.path.isdir(path):
+                    print(f"cat: {path}: Is a directory")
+                    status = 1
+                else:
+                    stream_file(path, out)
             except FileNotFoundError:
                 print(f"cat: {path}: No such file or directory")
+                status = 1
+            except BrokenPipeError:
+                raise
             except Exception as e:
                 print(f"cat: {e}")
+                status = 1
+        return status
+
+    @staticmethod
+    def cmd_head(current_dir, args):
+        """Show the first lines of files (head [-n N] file...)"""
+        parsed = _parse_line_args('head', args)
+        if parsed is None:
+            return 1
+        count, _, files = parsed
+        out = binary_stdout()
+        status = 0
+        for filename in files:
+            path = os.path.abspath(os.path.join(current_dir, filename))
+            try:
+                if len(files) > 1:
+                    out.write(f"==> {filename} <==\n".encode())
+                if filename == '-':
+                    head_lines(sys.stdin.buffer, count, out)
+                    continue
+                with open(path, 'rb') as f:
+                    head_lines(f, count, out)
+            except FileNotFoundError:
+                print(f"head: {path}: No such file or directory")
+                status = 1
+            except BrokenPipeError:
+                raise
+            except Exception as e:
+                print(f"head: {e}")
+                status = 1
+        return status
+
+    @staticmethod
+    def cmd_tail(current_dir, args):
+        """Show the last lines of files (tail [-n N] [-f] file...)"""
+        parsed = _parse_line_args('tail', args, allow_follow=True)
+        if parsed is None:
+            return 1
+        count, follow_mode, files = parsed
+        out = binary_stdout()
+        status = 0
+        for filename in files:
+            path = os.path.abspath(os.path.join(current_dir, filename))
+            try:
+                if len(files) > 1:
+                    out.write(f"==> {filename} <==\n".encode())
+                if filename == '-':
+                    tail_lines(sys.stdin.buffer, count, out)
+                    continue
+                with open(path, 'rb') as f:
+                    end = tail_lines(f, count, out)
+                    if follow_mode:
+                        follow(path, f, end, out)
+            except FileNotFoundError:
+                print(f"tail: {path}: No such file or directory")
+                status = 1
+            except BrokenPipeError:
+                raise
+            except Exception as e:
+                print(f"tail: {e}")
+                status = 1
+        return status
+
+    @staticmethod
+    def cmd_find(current_dir, args):
+        """Find files (find [PATH...] [-name GLOB] [-iname GLOB] [-type f|d|l] [-size ±N[ckMG]] [-mtime ±N] [-mmin ±N] [-maxdepth N] [-print])"""
+        from commands.search import ParallelWalker, find, parse_find_args
+        try:
+            paths, predicates, max_depth = parse_find_args(args)
+        except ValueError as e:
+            print(f"find: {e}")
+            return 1
+        walker = ParallelWalker()
+        write = sys.stdout.write
+        status = 0
+        for display in paths:
+            root = os.path.abspath(os.path.join(current_dir, os.path.expanduser(display)))
+            try:
+                errors = find(root, display, predicates, max_depth, write, walker)
+            except FileNotFoundError:
+                errors = [f"{display}: No such file or directory"]
+            except KeyboardInterrupt:
+                print("\n⚠️ find interrupted")
+                return 130
+            except BrokenPipeError:
+                raise
+            except OSError as e:
+                errors = [f"{display}: {e.strerror or e}"]
+            for error in errors:
+                print(f"find: {error}")
+                status = 1
+        return status
+
+    @staticmethod
+    def cmd_grep(current_dir, args):
+        """Search file contents (grep [-rinl] PATTERN [FILE...])"""
+        import re
+        from commands.search import GREP_FLAGS, GrepEngine, ParallelWalker, grep_files
+        flags = set()
+        operands = []
+        options_done = False
+        for arg in args:
+            if options_done or not arg.startswith('-') or arg == '-':
+                operands.append(arg)
+            elif arg == '--':
+                options_done = True
+            else:
+                unknown = set(arg[1:]) - set(GREP_FLAGS)
+                if unknown:
+                    print(f"grep: invalid option -- '{sorted(unknown)[0]}'")
+                    print("Usage: grep [-rinl] PATTERN [FILE...]")
+                    return 2
+                flags.update(arg[1:])
+        if not operands:
+            print("Usage: grep [-rinl] PATTERN [FILE...]")
+            return 2
+        pattern, files = operands[0], operands[1:]
+        recursive = bool(flags & set('rR'))
+        try:
+            engine = GrepEngine(pattern, ignore_case='i' in flags, list_only='l' in flags,
+                                line_numbers='n' in flags)
+        except re.error as e:
+            print(f"grep: invalid pattern: {e}")
+            return 2
+        out = binary_stdout()
+        try:
+            if not files and not recursive:
+                engine.search_stream(sys.stdin.buffer, out.write)
+            else:
+                targets = [(os.path.abspath(os.path.join(current_dir, os.path.expanduser(name))), name)
+                           for name in files or ['.']]
+                errors = []
+
+                def searchable():
+                    for path, display, size in grep_files(targets, recursive, ParallelWalker()):
+                        if size < 0:
+                            errors.append(display)
+                        else:
+                            yield path, display, size
+
+                engine.search_files(searchable(), recursive or len(files) > 1, out.write)
+                engine.errors[:0] = errors
+            out.flush()
+        except KeyboardInterrupt:
+            print("\n⚠️ grep interrupted")
+            return 130
+        except BrokenPipeError:
+            raise
+        except OSError as e:
+            print(f"grep: {e.strerror or e}")
+            return 2
+        for error in engine.errors:
+            print(f"grep: {error}")
+        if engine.errors:
+            return 2
+        return 0 if engine.matched else 1
 
     @staticmethod
     def cmd_echo(args):
@@ -130,30 +403,59 @@ class CommandMethods:
 
     @staticmethod
     def cmd_cp(current_dir, args):
-        """Copy file or directory"""
-        if len(args) < 2:
+        """Copy file or directory (cp [-r] [--no-resume] src dest)"""
+        from commands.copy_engine import CopyEngine
+        flags = [a for a in args if a.startswith('-')]
+        operands = [a for a in args if not a.startswith('-')]
+        recursive = any(f in ('-r', '-R', '--recursive') for f in flags)
+        unknown = [f for f in flags if f not in ('-r', '-R', '--recursive', '--no-resume')]
+        if unknown:
+            print(f"cp: unknown option {unknown[0]}")
+            return 1
+        if len(operands) < 2:
             print("cp: missing operand")
-            return
-        src = os.path.abspath(os.path.join(current_dir, args[0]))
-        dest = os.path.abspath(os.path.join(current_dir, args[1]))
+            return 1
+        src = os.path.abspath(os.path.join(current_dir, operands[0]))
+        dest = os.path.abspath(os.path.join(current_dir, operands[1]))
         try:
             if os.path.isfile(src):
-                shutil.copy2(src, dest)
-                print(f"✅ Copied {src} → {dest}")
+                if os.path.isdir(dest):
+                    dest = os.path.join(dest, os.path.basename(src))
             elif os.path.isdir(src):
-                shutil.copytree(src, dest)
-                print(f"✅ Copied directory {src} → {dest}")
+                if not recursive:
+                    print(f"cp: -r not specified; omitting directory {src}")
+                    return 1
             else:
                 print(f"cp: {src}: No such file or directory")
+                return 1
+
+            engine = CopyEngine(resume='--no-resume' not in flags)
+            stats = engine.copy(src, dest)
+            for error in stats.errors[:10]:
+                print(f"cp: {error}")
+            if len(stats.errors) > 10:
+                print(f"cp: ... {len(stats.errors) - 10} more errors")
+            if stats.interrupted:
+                print(f"⚠️ Interrupted after {stats.copied} files; run the same command again to resume")
+                return 130
+            rate = format_bytes(stats.bytes / stats.elapsed) if stats.elapsed else format_bytes(stats.bytes)
+            summary = f"{stats.copied} copied"
+            if stats.skipped:
+                summary += f", {stats.skipped} already up to date"
+            if stats.errors:
+                print(f"⚠️ Copied {src} → {dest} with {len(stats.errors)} errors ({summary})")
+                return 1
+            print(f"✅ Copied {src} → {dest} ({summary}, {format_bytes(stats.bytes)} in {stats.elapsed:.1f}s, {rate}/s)")
         except Exception as e:
             print(f"cp: {e}")
+            return 1
 
     @staticmethod
     def cmd_mv(current_dir, args):
         """Move/rename file or directory"""
         if len(args) < 2:
             print("mv: missing operand")
-            return
+            return 1
         src = os.path.abspath(os.path.join(current_dir, args[0]))
         dest = os.path.abspath(os.path.join(current_dir, args[1]))
         try:
@@ -161,69 +463,400 @@ class CommandMethods:
             print(f"✅ Moved {src} → {dest}")
         except Exception as e:
             print(f"mv: {e}")
+            return 1
 
     @staticmethod
     def cmd_ps(args):
-        """Show running processes"""
+        """Show running processes (ps [--sort cpu|mem] [-n N] [--json])"""
+        from commands.system_monitor import get_sampler
+        sort_key, limit = None, None
+        json_output = False
         try:
+            i = 0
+            while i < len(args):
+                if args[i] == '--sort' and i + 1 < len(args):
+                    sort_key = args[i + 1]
+                    i += 1
+                elif args[i] == '-n' and i + 1 < len(args):
+                    limit = int(args[i + 1])
+                    i += 1
+                elif args[i] == '--json':
+                    json_output = True
+                else:
+                    print(f"ps: unknown option {args[i]}")
+                    print("Usage: ps [--sort cpu|mem] [-n N] [--json]")
+                    return 1
+                i += 1
+            if sort_key not in (None, 'cpu', 'mem'):
+                print(f"ps: invalid sort key '{sort_key}' (use cpu or mem)")
+                return 1
+        except ValueError:
+            print("ps: -n expects a number")
+            return 1
+
+        try:
+            snapshot = get_sampler().latest()
+            processes = snapshot.processes
+            if sort_key:
+                field = 'cpu_percent' if sort_key == 'cpu' else 'memory_percent'
+                key = lambda p: getattr(p, field)
+                if limit is not None:
+                    processes = heapq.nlargest(limit, processes, key=key)
+                else:
+                    processes = sorted(processes, key=key, reverse=True)
+            elif limit is not None:
+                processes = processes[:limit]
+            if json_output:
+                from commands.output import write_json_records
+                write_json_records(proc._asdict() for proc in processes)
+                return 0
             print(f"{'PID':<8} {'NAME':<25} {'CPU%':<8} {'MEM%':<8} {'STATUS'}")
             print("-"*60)
-            for proc in psutil.process_iter(['pid','name','cpu_percent','memory_percent','status']):
-                info = proc.info
-                print(f"{info['pid']:<8} {info['name']:<25} {info['cpu_percent']:<8.1f} {info['memory_percent']:<8.1f} {info['status']}")
+            for proc in processes:
+                print(f"{proc.pid:<8} {proc.name:<25} {proc.cpu_percent:<8.1f} {proc.memory_percent:<8.1f} {proc.status}")
         except Exception as e:
             print(f"ps: {e}")
+            return 1
 
     @staticmethod
-    def cmd_top():
-        """Show CPU and memory usage"""
+    def cmd_top(args=()):
+        """Show CPU and memory usage (top [-b] [-d SECS] [-n K] [--sort cpu|mem])"""
+        from commands.system_monitor import get_sampler
+        batch, delay, count, sort_key = False, 2.0, None, 'cpu'
+        try:
+            i = 0
+            while i < len(args):
+                if args[i] == '-b':
+                    batch = True
+                elif args[i] == '-d' and i + 1 < len(args):
+                    delay = max(0.1, float(args[i + 1]))
+                    i += 1
+                elif args[i] == '-n' and i + 1 < len(args):
+                    count = int(args[i + 1])
+                    i += 1
+                elif args[i] == '--sort' and i + 1 < len(args) and args[i + 1] in ('cpu', 'mem'):
+                    sort_key = args[i + 1]
+                    i += 1
+                else:
+                    print(f"top: unknown option {args[i]}")
+                    print("Usage: top [-b] [-d SECS] [-n K] [--sort cpu|mem]")
+                    return 1
+                i += 1
+        except ValueError:
+            print("top: -d and -n expect numbers")
+            return 1
+
         try:
-            cpu = psutil.cpu_percent(interval=1)
-            mem = psutil.virtual_memory()
+            from commands.top_view import LiveTop
+            if not batch and LiveTop.supported():
+                LiveTop(delay=delay, count=count, sort_key=sort_key).run()
+                return
+            snapshot = get_sampler().latest()
+            cpu = snapshot.cpu_percent
+            mem = snapshot.memory
             print(f"CPU Usage: {cpu}%")
             print(f"Memory Usage: {mem.percent}% ({mem.used // (1024**3)}GB/{mem.total // (1024**3)}GB)")
+            if count:
+                field = 'cpu_percent' if sort_key == 'cpu' else 'memory_percent'
+                print(f"{'PID':<8} {'NAME':<25} {'CPU%':<8} {'MEM%':<8}")
+                for proc in heapq.nlargest(count, snapshot.processes, key=lambda p: getattr(p, field)):
+                    print(f"{proc.pid:<8} {proc.name:<25} {proc.cpu_percent:<8.1f} {proc.memory_percent:<8.1f}")
         except Exception as e:
             print(f"top: {e}")
+            return 1
 
     @staticmethod
-    def cmd_df():
-        """Show disk usage"""
+    def cmd_df(current_dir, args):
+        """Show disk usage (df [-h] [-T] [-a] [--json] [PATH ...])"""
+        from commands.disk_probe import get_disk_probe, mount_for
+        flags = set()
+        paths = []
+        json_output = False
+        for arg in args:
+            if arg == '--json':
+                json_output = True
+            elif arg.startswith('-') and len(arg) > 1:
+                unknown = set(arg[1:]) - set('hTa')
+                if unknown:
+                    print(f"df: invalid option -- '{sorted(unknown)[0]}'")
+                    print("Usage: df [-h] [-T] [-a] [--json] [PATH ...]")
+                    return 1
+                flags.update(arg[1:])
+            else:
+                paths.append(os.path.join(current_dir, arg))
         try:
-            partitions = psutil.disk_partitions()
-            for part in partitions:
-                usage = psutil.disk_usage(part.mountpoint)
-                print(f"{part.device} {usage.percent}% used ({usage.used // (1024**3)}GB/{usage.total // (1024**3)}GB)")
+            statuses = get_disk_probe().usage(include_pseudo='a' in flags or bool(paths))
         except Exception as e:
             print(f"df: {e}")
+            return 1
+
+        status = 0
+        if paths:
+            selected = []
+            for path in paths:
+                if not os.path.exists(path):
+                    print(f"df: {path}: No such file or directory")
+                    status = 1
+                    continue
+                mount = mount_for(path, statuses)
+                if mount is not None and mount not in selected:
+                    selected.append(mount)
+            statuses = selected
+
+        if json_output:
+            from commands.output import write_json_records
+            records = []
+            for mount in statuses:
+                usage = mount.usage
+                records.append({'device': mount.device, 'mountpoint': mount.mountpoint, 'fstype': mount.fstype,
+                                'total': usage.total if usage else None, 'used': usage.used if usage else None,
+                                'free': usage.free if usage else None, 'percent': usage.percent if usage else None,
+                                'error': mount.error})
+                if not mount.responded:
+                    status = 1
+            write_json_records(records)
+            return status
+
+        if 'h' in flags:
+            size = format_bytes
+            header = ('Size', 'Used', 'Avail')
+        else:
+            size = lambda n: str(n // 1024)
+            header = ('1K-blocks', 'Used', 'Available')
+        if not statuses:
+            return status
+        left = 2 if 'T' in flags else 1  # text columns; the numbers are right-aligned
+        rows = [('Filesystem', *(('Type',) if 'T' in flags else ()), *header, 'Use%', 'Mounted on')]
+        for mount in statuses:
+            kind = (mount.fstype,) if 'T' in flags else ()
+            if mount.responded:
+                usage = mount.usage
+                rows.append((mount.device, *kind, size(usage.total), size(usage.used), size(usage.free),
+                             f"{usage.percent:.0f}%", mount.mountpoint))
+            else:
+                rows.append((mount.device, *kind, '?', '?', '?', '-', f"{mount.mountpoint}  ⚠️ {mount.error}"))
+                status = 1
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]) - 1)]
+        for row in rows:
+            cells = [cell.ljust(widths[i]) if i < left else cell.rjust(widths[i])
+                     for i, cell in enumerate(row[:-1])]
+            print(' '.join(cells + [row[-1]]))
+        return status
 
     @staticmethod
-    def cmd_free():
-        """Show memory usage"""
+    def cmd_du(current_dir, args):
+        """Show directory sizes (du [-sh] [-d N|--max-depth=N] [--top N] [--no-cache] [PATH ...])"""
+        from commands.disk_usage import DiskUsage
+        usage = "Usage: du [-sh] [-d N|--max-depth=N] [--top N] [--no-cache] [PATH ...]"
+        flags = set()
+        max_depth = top = None
+        use_cache = True
+        paths = []
+        i = 0
         try:
-            mem = psutil.virtual_memory()
-            swap = psutil.swap_memory()
+            while i < len(args):
+                arg = args[i]
+                if arg in ('-d', '--max-depth', '--top') and i + 1 < len(args):
+                    value = int(args[i + 1])
+                    if arg == '--top':
+                        top = value
+                    else:
+                        max_depth = value
+                    i += 1
+                elif arg.startswith('--max-depth='):
+                    max_depth = int(arg.partition('=')[2])
+                elif arg == '--no-cache':
+                    use_cache = False
+                elif arg.startswith('-') and len(arg) > 1:
+                    unknown = set(arg[1:]) - set('sh')
+                    if unknown:
+                        print(f"du: invalid option -- '{sorted(unknown)[0]}'")
+                        print(usage)
+                        return 1
+                    flags.update(arg[1:])
+                else:
+                    paths.append(arg)
+                i += 1
+        except ValueError:
+            print(f"du: invalid number: {args[i + 1] if i + 1 < len(args) else args[i]}")
+            return 1
+        if 's' in flags:
+            max_depth = 0
+        size = format_bytes if 'h' in flags else (lambda n: str(-(-n // 1024)))
+
+        engine = DiskUsage(use_cache=use_cache)
+        status = 0
+        for display in paths or ['.']:
+            path = os.path.abspath(os.path.join(current_dir, os.path.expanduser(display)))
+            try:
+                report = engine.measure(path)
+            except FileNotFoundError:
+                print(f"du: {display}: No such file or directory")
+                status = 1
+                continue
+            except OSError as e:
+                print(f"du: {display}: {e.strerror or e}")
+                status = 1
+                continue
+            for error in report.errors:
+                print(f"du: {display}{error[len(path):]}")
+                status = 1
+            nodes = report.post_order(max_depth)
+            if top is not None:
+                nodes = heapq.nlargest(top, nodes, key=lambda node: node.bytes)
+            sys.stdout.write(''.join(f"{size(node.bytes)}\t{display}{node.path[len(path):]}\n" for node in nodes))
+            if report.interrupted:
+                print(f"⚠️ du interrupted: {display} (partial sizes)")
+                return 130
+        return status
+
+    @staticmethod
+    def cmd_free(args=()):
+        """Show memory usage (free [--json])"""
+        from commands.system_monitor import get_sampler
+        unknown = [a for a in args if a != '--json']
+        if unknown:
+            print(f"free: unknown option {unknown[0]}")
+            print("Usage: free [--json]")
+            return 1
+        try:
+            snapshot = get_sampler().latest()
+            mem = snapshot.memory
+            swap = snapshot.swap
+            if '--json' in args:
+                from commands.output import write_json
+                write_json({'memory': mem._asdict(), 'swap': swap._asdict()})
+                return 0
             print(f"Memory: total={mem.total // (1024**2)}MB, used={mem.used // (1024**2)}MB, free={mem.available // (1024**2)}MB")
             print(f"Swap: total={swap.total // (1024**2)}MB, used={swap.used // (1024**2)}MB, free={swap.free // (1024**2)}MB")
         except Exception as e:
             print(f"free: {e}")
+            return 1
 
     @staticmethod
     def cmd_clear():
         """Clear terminal"""
-        os.system('cls' if os.name=='nt' else 'clear')
+        from commands.output import CLEAR_SCREEN
+        sys.stdout.write(CLEAR_SCREEN)
+        sys.stdout.flush()
 
     @staticmethod
-    def cmd_history(history_commands):
-        """Show command history"""
-        print("🔹 Command History:")
-        for i, cmd in enumerate(history_commands[-50:], start=1):
-            print(f"{i:4} {cmd}")
+    def cmd_history(history, args):
+        """Show or search command history (history [search <query>] [--json])"""
+        json_output = '--json' in args
+        args = [a for a in args if a != '--json']
+        if args and args[0] == 'search':
+            if len(args) > 1:
+                query = ' '.join(args[1:])
+                results = history.search_history(query)
+                if json_output:
+                    from commands.output import write_json_records
+                    write_json_records({'index': i, 'command': cmd} for i, cmd in enumerate(results, 1))
+                    return 0
+                lines = [f"🔹 History search results for '{query}':\n"]
+                lines.extend(f"{i:4} {cmd}\n" for i, cmd in enumerate(results, 1))
+                sys.stdout.write(''.join(lines))
+            else:
+                print("Usage: history search <query>")
+                return 1
+        else:
+            # Show last 50 commands by default
+            commands = history.recent(50)
+            start_idx = len(history.commands) - len(commands)
+            if json_output:
+                from commands.output import write_json_records
+                write_json_records({'index': i, 'command': cmd} for i, cmd in enumerate(commands, start_idx + 1))
+                return 0
+            lines = ["🔹 Command history:\n"]
+            lines.extend(f"{i:4} {cmd}\n" for i, cmd in enumerate(commands, start_idx + 1))
+            sys.stdout.write(''.join(lines))
+
+    @staticmethod
+    def cmd_jobs(jobs, args):
+        """List background jobs (jobs [-l])"""
+        for job in jobs.jobs():
+            print(jobs.format_job(job, show_pids='-l' in args))
+
+    @staticmethod
+    def cmd_fg(jobs, args):
+        """Bring a background job to the foreground (fg [%N])"""
+        job = _job_arg(jobs, 'fg', args)
+        if job is None:
+            return 1
+        print(job.command)
+        return jobs.foreground(job)
+
+    @staticmethod
+    def cmd_bg(jobs, args):
+        """Resume a stopped job in the background (bg [%N])"""
+        import signal
+        job = _job_arg(jobs, 'bg', args)
+        if job is None:
+            return 1
+        if job.state != 'Stopped':
+            print(f"bg: job {job.id} already in background")
+            return 0
+        jobs.signal(job, signal.SIGCONT)
+        print(f"[{job.id}]+ {job.command} &")
+
+    @staticmethod
+    def cmd_wait(jobs, args):
+        """Wait for background jobs to finish (wait [%N])"""
+        if not args:
+            return jobs.wait()
+        job = _job_arg(jobs, 'wait', args)
+        return jobs.wait(job) if job is not None else 127
+
+    @staticmethod
+    def cmd_kill(jobs, args):
+        """Send a signal to jobs or processes (kill [-s SIG | -SIG] %N|PID ... , kill -l)"""
+        import signal
+        from commands.jobs import parse_signal
+        if args and args[0] == '-l':
+            print(' '.join(sig.name[3:] for sig in sorted(signal.Signals, key=int)))
+            return 0
+        sig = signal.SIGTERM
+        try:
+            if args and args[0] == '-s' and len(args) > 1:
+                sig, args = parse_signal(args[1]), args[2:]
+            elif args and args[0].startswith('-') and len(args[0]) > 1:
+                sig, args = parse_signal(args[0][1:]), args[1:]
+        except ValueError as e:
+            print(f"kill: {e}")
+            return 1
+        if not args:
+            print("Usage: kill [-s SIG | -SIG] %N|PID ...")
+            return 1
+        status = 0
+        for target in args:
+            if target.startswith('%'):
+                job = jobs.find(target)
+                if job is None:
+                    print(f"kill: {target}: no such job")
+                    status = 1
+                elif not jobs.signal(job, sig):
+                    print(f"kill: {target}: job can't receive {sig.name}")
+                    status = 1
+                continue
+            try:
+                os.kill(int(target), sig)
+            except ValueError:
+                print(f"kill: {target}: arguments must be process or job IDs")
+                status = 1
+            except OSError as e:
+                print(f"kill: ({target}) - {e.strerror}")
+                status = 1
+        return status
 
     @staticmethod
     def cmd_help():
         """Show help"""
         print("📌 Available commands:")
-        print("File: ls, cd, pwd, mkdir, rmdir, rm, touch, cat, cp, mv, echo")
-        print("System: ps, top, df, free")
-        print("Utilities: history, clear, help")
+        print("File: ls, cd, pwd, mkdir, rmdir, rm, touch, cat, head, tail, cp, mv, echo")
+        print("Search: find, grep")
+        print("System: ps, top, df, du, free")
+        print("Utilities: history, clear, help, time, profile, metrics")
+        print("Jobs: cmd &, jobs, fg, bg, wait, kill %N")
+        print("Shell: cmd | cmd, cmd > file, cmd >> file, cmd < file; other programs run from PATH")
+        print("Output: long output opens in $PAGER on a terminal; --json for ls, ps, df, free, history")
         print("Exit: exit, quit")
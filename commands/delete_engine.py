@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+import time
+from typing import List, Optional
+
+from commands import cancel as cancellation
+from commands.progress import ProgressLine
+
+class DeleteStats:
+    def __init__(self):
+        self.files = 0
+        self.dirs = 0
+        self.bytes = 0
+        self.errors: List[str] = []
+        self.elapsed = 0.0
+        self.interrupted = False
+
+class DeleteEngine:
+    """Parallel recursive delete.
+
+    The tree is walked with ``os.scandir`` on the calling thread, files are
+    unlinked by a pool of workers fed through a bounded queue, and directories
+    are removed bottom-up once their contents are gone. :meth:`count` walks the
+    same way without deleting anything, for dry runs. Both stop between
+    entries once ``cancel`` is set (Ctrl+C, or ``kill %N`` for a job).
+    """
+
+    def __init__(self, workers: Optional[int] = None, progress: bool = True,
+                 cancel: Optional[threading.Event] = None):
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.progress = progress
+        self.cancel = cancel if cancel is not None else cancellation.cancel_event()
+
+    def count(self, path: str) -> DeleteStats:
+        """Count the files, directories and bytes a delete would remove"""
+        stats = DeleteStats()
+        started = time.monotonic()
+        progress = ProgressLine("rm --dry-run").start() if self.progress else None
+        try:
+            stack = [path]
+            while stack and not self.cancel.is_set():
+                directory = stack.pop()
+                stats.dirs += 1
+                try:
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                                continue
+                            size = entry.stat(follow_symlinks=False).st_size
+                            stats.files += 1
+                            stats.bytes += size
+                            if progress:
+                                progress.add(1, size)
+                except OSError as e:
+                    stats.errors.append(f"{directory}: {e.strerror or e}")
+        except KeyboardInterrupt:
+            self.cancel.set()
+        finally:
+            if progress:
+                progress.finish()
+            stats.elapsed = time.monotonic() - started
+        stats.interrupted = self.cancel.is_set()
+        return stats
+
+    def delete(self, path: str) -> DeleteStats:
+        """Remove the directory tree at ``path``"""
+        stats = DeleteStats()
+        started = time.monotonic()
+        progress = ProgressLine("rm").start() if self.progress else None
+        tasks: queue.Queue = queue.Queue(maxsize=self.workers * 256)
+        cancelled = self.cancel
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                file_path = tasks.get()
+                if file_path is None:
+                    return
+                if cancelled.is_set():
+                    continue
+                try:
+                    size = os.lstat(file_path).st_size
+                    os.unlink(file_path)
+                except OSError as e:
+                    stats.errors.append(f"{file_path}: {e.strerror or e}")
+                    continue
+                with lock:
+                    stats.files += 1
+                    stats.bytes += size
+                if progress:
+                    progress.add(1, size)
+
+        threads = [threading.Thread(target=worker, name=f"rm-{i}", daemon=True) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        directories: List[str] = []
+        try:
+            try:
+                stack = [path]
+                while stack and not cancelled.is_set():
+                    directory = stack.pop()
+                    directories.append(directory)
+                    try:
+                        with os.scandir(directory) as entries:
+                            for entry in entries:
+                                if entry.is_dir(follow_symlinks=False):
+                                    stack.append(entry.path)
+                                elif not cancellation.put(tasks, entry.path, cancelled):
+                                    break
+                    except OSError as e:
+                        stats.errors.append(f"{directory}: {e.strerror or e}")
+            except KeyboardInterrupt:
+                cancelled.set()
+            finally:
+                # Sets ``cancelled`` itself if Ctrl+C arrives while waiting
+                cancellation.stop_workers(tasks, threads, cancelled)
+
+            if not cancelled.is_set():
+                # Parents were visited before their children, so reverse order is bottom-up
+                for directory in reversed(directories):
+                    try:
+                        os.rmdir(directory)
+                        stats.dirs += 1
+                    except OSError as e:
+                        stats.errors.append(f"{directory}: {e.strerror or e}")
+        except KeyboardInterrupt:
+            cancelled.set()
+        finally:
+            if progress:
+                progress.finish()
+            stats.elapsed = time.monotonic() - started
+        stats.interrupted = cancelled.is_set()
+        return stats
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+import psutil
+
+DiskSample = namedtuple('DiskSample', 'device mountpoint fstype usage')
+
+# Kernel and container plumbing that df hides unless -a is given
+PSEUDO_FILESYSTEMS = frozenset({
+    'autofs', 'binfmt_misc', 'bpf', 'cgroup', 'cgroup2', 'configfs', 'debugfs', 'devfs', 'devpts',
+    'devtmpfs', 'efivarfs', 'fusectl', 'hugetlbfs', 'mqueue', 'nsfs', 'overlay', 'proc', 'pstore',
+    'ramfs', 'rpc_pipefs', 'securityfs', 'selinuxfs', 'squashfs', 'sysfs', 'tmpfs', 'tracefs',
+    'aufs', 'fuse.lxcfs', 'fuse.snapfuse', 'fuse.gvfsd-fuse', 'fuse.portal', 'nullfs', 'map',
+})
+
+class MountStatus:
+    """Usage of one mount, or why there is none"""
+    __slots__ = ('device', 'mountpoint', 'fstype', 'usage', 'error', 'checked')
+
+    def __init__(self, device: str, mountpoint: str, fstype: str, usage=None, error: Optional[str] = None,
+                 checked: float = 0.0):
+        self.device = device
+        self.mountpoint = mountpoint
+        self.fstype = fstype
+        self.usage = usage
+        self.error = error
+        self.checked = checked
+
+    @property
+    def responded(self) -> bool:
+        return self.usage is not None
+
+class DiskProbe:
+    """Mount usage with concurrent, time-limited statvfs calls.
+
+    Each mount is probed in its own daemon thread and waited for up to
+    ``timeout`` seconds; mounts that haven't answered by then (a dead NFS
+    server, a wedged FUSE daemon) are reported as not responding rather than
+    blocking the caller. A probe stuck in the kernel is never started twice
+    or waited for again: until it returns, the mount reports as not
+    responding straight away. Results are cached for ``ttl`` seconds so
+    repeated ``df`` calls are cheap.
+    """
+
+    def __init__(self, timeout: float = 1.0, ttl: float = 2.0):
+        self.timeout = timeout
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache: Dict[str, MountStatus] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+
+    @staticmethod
+    def mounts(include_pseudo: bool = False) -> list:
+        """Mounted filesystems, one per device (the shortest mount point wins, as in df)"""
+        by_device = {}
+        for part in psutil.disk_partitions(all=True):
+            if not include_pseudo:
+                # A container's root is usually overlay; keep it, drop the rest
+                if part.fstype in PSEUDO_FILESYSTEMS and part.mountpoint != '/':
+                    continue
+                previous = by_device.get(part.device)
+                if previous is not None and len(previous.mountpoint) <= len(part.mountpoint):
+                    continue
+                by_device[part.device] = part
+            else:
+                by_device[(part.device, part.mountpoint)] = part
+        return sorted(by_device.values(), key=lambda part: part.mountpoint)
+
+    def _probe(self, part, done: threading.Event):
+        try:
+            status = MountStatus(part.device, part.mountpoint, part.fstype, usage=psutil.disk_usage(part.mountpoint))
+        except OSError as e:
+            status = MountStatus(part.device, part.mountpoint, part.fstype, error=e.strerror or str(e))
+        status.checked = time.monotonic()
+        with self._lock:
+            self._cache[part.mountpoint] = status
+            self._inflight.pop(part.mountpoint, None)
+        done.set()
+
+    def usage(self, include_pseudo: bool = False, timeout: Optional[float] = None) -> List[MountStatus]:
+        """Status of every mount; waits at most ``timeout`` seconds in total"""
+        timeout = self.timeout if timeout is None else timeout
+        parts = self.mounts(include_pseudo)
+        now = time.monotonic()
+        waiting: Dict[str, threading.Event] = {}
+        with self._lock:
+            for part in parts:
+                cached = self._cache.get(part.mountpoint)
+                if cached is not None and now - cached.checked < self.ttl:
+                    continue
+                if part.mountpoint in self._inflight:
+                    continue  # still stuck from an earlier call; don't wait on it again
+                done = self._inflight[part.mountpoint] = threading.Event()
+                threading.Thread(target=self._probe, args=(part, done), daemon=True,
+                                 name=f"df:{part.mountpoint}").start()
+                waiting[part.mountpoint] = done
+        deadline = now + timeout
+        for done in waiting.values():
+            done.wait(max(0.0, deadline - time.monotonic()))
+
+        results = []
+        with self._lock:
+            for part in parts:
+                status = self._cache.get(part.mountpoint)
+                if part.mountpoint in self._inflight:
+                    status = MountStatus(part.device, part.mountpoint, part.fstype, error="not responding")
+                elif status is None:
+                    status = MountStatus(part.device, part.mountpoint, part.fstype, error="unknown")
+                results.append(status)
+        return results
+
+    def samples(self) -> List[DiskSample]:
+        """Responding mounts as DiskSample tuples, for the system sampler"""
+        return [DiskSample(s.device, s.mountpoint, s.fstype, s.usage) for s in self.usage() if s.responded]
+
+
+_probe: Optional[DiskProbe] = None
+_probe_lock = threading.Lock()
+
+def get_disk_probe() -> DiskProbe:
+    """Shared probe, so the cache and in-flight probes are shared too"""
+    global _probe
+    with _probe_lock:
+        if _probe is None:
+            _probe = DiskProbe()
+        return _probe
+
+def mount_for(path: str, statuses: List[MountStatus]) -> Optional[MountStatus]:
+    """The mount in ``statuses`` that holds ``path`` (longest matching mount point)"""
+    path = os.path.realpath(path)
+    best = None
+    for status in statuses:
+        mountpoint = status.mountpoint.rstrip(os.sep) or os.sep
+        if path == mountpoint or path.startswith(mountpoint.rstrip(os.sep) + os.sep):
+            if best is None or len(mountpoint) > len(best.mountpoint):
+                best = status
+    return best
@@ -0,0 +1,207 @@
+import concurrent.futures
+import json
+import os
+import stat
+import time
+from typing import Dict, List, Optional, Tuple
+
+CACHE_VERSION = 1
+
+class DiskUsageCache:
+    """Per-directory sizes kept on disk between ``du`` runs.
+
+    Entries are keyed by ``"dev:ino"`` and hold the directory's mtime (ns),
+    the bytes used by its own non-directory entries, their count and the
+    names of its subdirectories. An entry is only used while the directory's
+    mtime still matches, i.e. no entry was added, removed or renamed in it.
+    Entries not used for ``max_age`` seconds are dropped when saving.
+
+    Cache hits only update last-used times in memory. The file is rewritten
+    when entries were added or changed, or, for a fully cached run, at most
+    once per ``touch_interval`` seconds to persist those times.
+    """
+
+    def __init__(self, path: str = ".terminal_du_cache.json", max_age: float = 30 * 86400,
+                 touch_interval: float = 86400):
+        self.path = os.path.expanduser(f"~/{path}")
+        self.max_age = max_age
+        self.touch_interval = touch_interval
+        self.entries: Dict[str, list] = {}
+        self._loaded = False
+        self._saved_at = 0.0
+        self.dirty = False
+        self.touched = False
+
+    def load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._saved_at = os.fstat(f.fileno()).st_mtime
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get('version') == CACHE_VERSION:
+            self.entries = data.get('dirs', {})
+
+    def get(self, key: str, mtime_ns: int) -> Optional[list]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != mtime_ns:
+            return None
+        entry[4] = int(time.time())
+        self.touched = True
+        return entry
+
+    def put(self, key: str, mtime_ns: int, own_bytes: int, own_files: int, subdirs: List[str]):
+        self.entries[key] = [mtime_ns, own_bytes, own_files, subdirs, int(time.time())]
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty and not (self.touched and time.time() - self._saved_at >= self.touch_interval):
+            return
+        cutoff = time.time() - self.max_age
+        entries = {key: entry for key, entry in self.entries.items() if entry[4] >= cutoff}
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'dirs': entries}, f, separators=(',', ':'))
+            os.replace(tmp, self.path)
+            self._saved_at = time.time()
+            self.dirty = self.touched = False
+        except OSError:
+            pass
+
+class DirUsage:
+    __slots__ = ('path', 'depth', 'parent', 'bytes', 'files', 'children')
+
+    def __init__(self, path: str, depth: int, parent: Optional['DirUsage'], own_bytes: int):
+        self.path = path
+        self.depth = depth
+        self.parent = parent
+        self.bytes = own_bytes
+        self.files = 0
+        self.children: List['DirUsage'] = []
+
+class UsageReport:
+    def __init__(self, root: DirUsage):
+        self.root = root
+        self.dirs_scanned = 0
+        self.dirs_cached = 0
+        self.errors: List[str] = []
+        self.interrupted = False
+
+    def post_order(self, max_depth: Optional[int] = None):
+        """Directories children-first, as du prints them"""
+        stack = [(self.root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded or (max_depth is not None and node.depth >= max_depth):
+                if max_depth is None or node.depth <= max_depth:
+                    yield node
+                continue
+            stack.append((node, True))
+            for child in sorted(node.children, key=lambda c: c.path, reverse=True):
+                stack.append((child, False))
+
+def _usage(st: os.stat_result) -> int:
+    """Bytes allocated on disk (apparent size where st_blocks is missing)"""
+    blocks = getattr(st, 'st_blocks', None)
+    return blocks * 512 if blocks is not None else st.st_size
+
+class DiskUsage:
+    """Directory tree sizes from a parallel scandir walk with a persistent cache.
+
+    Each directory is listed on a thread pool; directories whose
+    (device, inode, mtime) match the cache are not listed at all, only their
+    subdirectories are visited. Like du, sizes are allocated blocks and every
+    directory adds its own blocks. Since appending to a file doesn't change
+    its directory's mtime, a cached directory won't notice files that only
+    grew or shrank in place; use ``use_cache=False`` for an exact walk.
+    """
+
+    def __init__(self, cache: Optional[DiskUsageCache] = None, workers: Optional[int] = None,
+                 use_cache: bool = True):
+        self.cache = cache if cache is not None else DiskUsageCache()
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.use_cache = use_cache
+
+    def _scan(self, path: str, st: os.stat_result) -> Tuple[int, int, List[Tuple[str, os.stat_result]], bool]:
+        """(own bytes, own files, subdirectories, from cache) for one directory"""
+        key = f"{st.st_dev}:{st.st_ino}"
+        cached = self.cache.get(key, st.st_mtime_ns) if self.use_cache else None
+        if cached is not None:
+            subdirs = []
+            for name in cached[3]:
+                child = os.path.join(path, name)
+                try:
+                    child_st = os.lstat(child)
+                except FileNotFoundError:
+                    continue
+                if stat.S_ISDIR(child_st.st_mode):
+                    subdirs.append((child, child_st))
+            return cached[1], cached[2], subdirs, True
+
+        own_bytes = own_files = 0
+        subdirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    entry_st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.S_ISDIR(entry_st.st_mode):
+                    subdirs.append((entry.path, entry_st))
+                else:
+                    own_bytes += _usage(entry_st)
+                    own_files += 1
+        self.cache.put(key, st.st_mtime_ns, own_bytes, own_files, [os.path.basename(p) for p, _ in subdirs])
+        return own_bytes, own_files, subdirs, False
+
+    def measure(self, root: str) -> UsageReport:
+        """Walk ``root`` and return per-directory totals (subtrees included)"""
+        root_st = os.lstat(root)
+        report = UsageReport(DirUsage(root, 0, None, _usage(root_st)))
+        if not stat.S_ISDIR(root_st.st_mode):
+            return report
+        if self.use_cache:
+            self.cache.load()
+
+        nodes: List[DirUsage] = [report.root]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="du") as pool:
+            pending = {pool.submit(self._scan, root, root_st): report.root}
+            try:
+                while pending:
+                    done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        node = pending.pop(future)
+                        try:
+                            own_bytes, own_files, subdirs, cached = future.result()
+                        except OSError as e:
+                            report.errors.append(f"{node.path}: {e.strerror or e}")
+                            continue
+                        node.bytes += own_bytes
+                        node.files += own_files
+                        if cached:
+                            report.dirs_cached += 1
+                        else:
+                            report.dirs_scanned += 1
+                        for path, st in subdirs:
+                            child = DirUsage(path, node.depth + 1, node, _usage(st))
+                            node.children.append(child)
+                            nodes.append(child)
+                            pending[pool.submit(self._scan, path, st)] = child
+            except KeyboardInterrupt:
+                report.interrupted = True
+                for future in pending:
+                    future.cancel()
+            finally:
+                if self.use_cache:
+                    self.cache.save()
+
+        # Parents were appended before their children, so one reverse pass sums every subtree
+        for node in reversed(nodes):
+            if node.parent is not None:
+                node.parent.bytes += node.bytes
+                node.parent.files += node.files
+        return report
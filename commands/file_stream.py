@@ -0,0 +1,116 @@
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from typing import BinaryIO, Optional
+
+CHUNK_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 64 * 1024 * 1024
+TAIL_BLOCK_SIZE = 64 * 1024
+
+def binary_stdout() -> BinaryIO:
+    """The byte stream behind sys.stdout, after flushing any pending text"""
+    sys.stdout.flush()
+    return sys.stdout.buffer
+
+def copy_stream(src: BinaryIO, out: BinaryIO, start: Optional[int] = None):
+    """Copy ``src`` to EOF in fixed-size chunks, optionally seeking to ``start`` first"""
+    if start is not None:
+        src.seek(start)
+    buf = bytearray(CHUNK_SIZE)
+    view = memoryview(buf)
+    while True:
+        n = src.readinto(buf)
+        if not n:
+            break
+        out.write(view[:n])
+
+def stream_file(path: str, out: BinaryIO):
+    """Write a file's bytes to ``out`` without decoding or loading it whole"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_THRESHOLD:
+            copy_stream(f, out)
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, 'madvise'):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mm) as view:
+                    for offset in range(0, size, CHUNK_SIZE):
+                        out.write(view[offset:offset + CHUNK_SIZE])
+    out.flush()
+
+def head_lines(src: BinaryIO, count: int, out: BinaryIO):
+    """Write the first ``count`` lines of ``src``"""
+    remaining = count
+    while remaining > 0:
+        chunk = src.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        end = 0
+        while remaining > 0:
+            end = chunk.find(b'\n', end) + 1
+            if not end:
+                end = len(chunk)
+                break
+            remaining -= 1
+        out.write(chunk[:end])
+    out.flush()
+
+def tail_offset(f: BinaryIO, count: int) -> int:
+    """Offset where the last ``count`` lines start, found by seeking backwards"""
+    end = f.seek(0, os.SEEK_END)
+    pos = end
+    newlines = 0
+    # A trailing newline terminates the last line rather than starting a new one
+    if end:
+        f.seek(end - 1)
+        if f.read(1) == b'\n':
+            newlines = -1
+    while pos > 0:
+        step = min(TAIL_BLOCK_SIZE, pos)
+        pos -= step
+        f.seek(pos)
+        block = f.read(step)
+        index = len(block)
+        while True:
+            index = block.rfind(b'\n', 0, index)
+            if index < 0:
+                break
+            newlines += 1
+            if newlines == count:
+                return pos + index + 1
+    return 0
+
+def tail_lines(f: BinaryIO, count: int, out: BinaryIO) -> int:
+    """Write the last ``count`` lines of ``f``; returns the end offset"""
+    if not f.seekable():
+        for line in deque(f, maxlen=max(count, 0)):
+            out.write(line)
+        out.flush()
+        return 0
+    if count <= 0:
+        return f.seek(0, os.SEEK_END)
+    copy_stream(f, out, tail_offset(f, count))
+    out.flush()
+    return f.tell()
+
+def follow(path: str, f: BinaryIO, position: int, out: BinaryIO, interval: float = 0.5):
+    """Keep writing data appended to ``path`` until interrupted (tail -f)"""
+    try:
+        while True:
+            try:
+                size = os.stat(path).st_size
+            except FileNotFoundError:
+                size = position
+            if size < position:  # truncated or rotated in place
+                position = 0
+            if size > position:
+                f.seek(position)
+                copy_stream(f, out)
+                out.flush()
+                position = f.tell()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,231 @@
+import atexit
+import bisect
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from commands.progress import format_bytes
+
+def _peak_rss_bytes() -> Optional[int]:
+    """High-water RSS of this process (VmHWM on Linux, ru_maxrss elsewhere)"""
+    try:
+        with open('/proc/self/status', 'rb') as f:
+            for line in f:
+                if line.startswith(b'VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _reset_peak_rss() -> bool:
+    """Reset VmHWM so the next reading covers only what runs after this (Linux)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+class TimingReport:
+    def __init__(self, real: float, user: float, sys_time: float, peak_rss: Optional[int],
+                 child_peak_rss: Optional[int], peak_is_lifetime: bool):
+        self.real = real
+        self.user = user
+        self.sys = sys_time
+        self.peak_rss = peak_rss
+        self.child_peak_rss = child_peak_rss
+        self.peak_is_lifetime = peak_is_lifetime
+
+    def format(self) -> str:
+        def clock(seconds):
+            minutes, seconds = divmod(seconds, 60)
+            return f"{int(minutes)}m{seconds:.3f}s"
+
+        lines = [f"real\t{clock(self.real)}", f"user\t{clock(self.user)}", f"sys\t{clock(self.sys)}"]
+        if self.peak_rss is not None:
+            note = " (process lifetime)" if self.peak_is_lifetime else ""
+            lines.append(f"rss\t{format_bytes(self.peak_rss)} peak{note}")
+        if self.child_peak_rss:
+            lines.append(f"child\t{format_bytes(self.child_peak_rss)} peak")
+        return '\n'.join(lines)
+
+def time_call(func: Callable[[], int]) -> Tuple[int, TimingReport]:
+    """Run ``func`` and measure wall, CPU (ours plus reaped children) and peak RSS"""
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss if resource else 0
+    reset = _reset_peak_rss()
+    before = os.times()
+    start = time.perf_counter()
+    try:
+        status = func()
+    finally:
+        real = time.perf_counter() - start
+        after = os.times()
+    user = (after.user - before.user) + (after.children_user - before.children_user)
+    sys_time = (after.system - before.system) + (after.children_system - before.children_system)
+    child_peak = None
+    if resource is not None:
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        if children_after > children_before:
+            child_peak = children_after if sys.platform == 'darwin' else children_after * 1024
+    return status, TimingReport(real, user, sys_time, _peak_rss_bytes(), child_peak, not reset)
+
+
+# Upper bounds in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class LatencyHistogram:
+    __slots__ = ('counts', 'total', 'count', 'failures')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.failures = 0
+
+    def observe(self, seconds: float, failed: bool):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.failures += failed
+
+    def cumulative(self) -> List[int]:
+        running, out = 0, []
+        for n in self.counts:
+            running += n
+            out.append(running)
+        return out
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile"""
+        target = q * self.count
+        for bound, seen in zip(LATENCY_BUCKETS + (float('inf'),), self.cumulative()):
+            if seen >= target:
+                return bound
+        return float('inf')
+
+def _prometheus_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class MetricsSink:
+    """Per-command latency histograms written to a local file.
+
+    ``format`` is ``'jsonl'`` or ``'prometheus'`` and defaults from the file
+    extension (``.prom`` means Prometheus). JSONL files get one line per
+    command per flush holding the histogram of the commands since the last
+    flush, so lines can simply be summed. Prometheus files are rewritten with
+    the cumulative histograms in text exposition format, ready for a
+    node_exporter textfile collector. Recording only touches memory; the file
+    is written at most every ``flush_interval`` seconds and at exit.
+    """
+
+    METRIC = 'pyterminal_command_duration_seconds'
+
+    def __init__(self, path: str, format: Optional[str] = None, flush_interval: float = 10.0):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.format = format or ('prometheus' if self.path.endswith('.prom') else 'jsonl')
+        if self.format not in ('jsonl', 'prometheus'):
+            raise ValueError(f"unknown metrics format: {self.format}")
+        self.flush_interval = flush_interval
+        self.totals: Dict[str, LatencyHistogram] = {}
+        self._pending: Dict[str, LatencyHistogram] = {}
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def record(self, command: str, seconds: float, status: int):
+        for table in (self.totals, self._pending):
+            histogram = table.get(command)
+            if histogram is None:
+                histogram = table[command] = LatencyHistogram()
+            histogram.observe(seconds, bool(status))
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        try:
+            if self.format == 'jsonl':
+                self._append_jsonl()
+            else:
+                self._write_prometheus()
+        except OSError as e:
+            print(f"metrics: {self.path}: {e.strerror or e}", file=sys.stderr)
+        self._pending = {}
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def _append_jsonl(self):
+        now = time.time()
+        labels = [str(b) for b in LATENCY_BUCKETS] + ['+Inf']
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for command, histogram in self._pending.items():
+                f.write(json.dumps({'ts': round(now, 3), 'command': command, 'count': histogram.count,
+                                    'sum': round(histogram.total, 6), 'failures': histogram.failures,
+                                    'buckets': dict(zip(labels, histogram.counts))}) + '\n')
+
+    def _write_prometheus(self):
+        out = io.StringIO()
+        out.write(f"# HELP {self.METRIC} Time to run a terminal command, by command name\n")
+        out.write(f"# TYPE {self.METRIC} histogram\n")
+        for command, histogram in sorted(self.totals.items()):
+            label = _prometheus_label(command)
+            for bound, seen in zip(LATENCY_BUCKETS + ('+Inf',), histogram.cumulative()):
+                out.write(f'{self.METRIC}_bucket{{command="{label}",le="{bound}"}} {seen}\n')
+            out.write(f'{self.METRIC}_sum{{command="{label}"}} {histogram.total:.6f}\n')
+            out.write(f'{self.METRIC}_count{{command="{label}"}} {histogram.count}\n')
+        out.write("# HELP pyterminal_command_failures_total Commands that exited with a non-zero status\n")
+        out.write("# TYPE pyterminal_command_failures_total counter\n")
+        for command, histogram in sorted(self.totals.items()):
+            out.write(f'pyterminal_command_failures_total{{command="{_prometheus_label(command)}"}} {histogram.failures}\n')
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(out.getvalue())
+        os.replace(tmp, self.path)
+
+class CommandProfiler:
+    """Run each command under cProfile, save its stats and print the top entries"""
+
+    def __init__(self, directory: str = "~/.terminal_profiles", top: int = 15, out=None):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.top = top
+        self.out = out
+        self._count = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def run(self, name: str, func: Callable[[], int]) -> int:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func()
+        finally:
+            profiler.disable()
+            self._count += 1
+            safe_name = re.sub(r'[^\w.-]', '_', name)[:40] or 'command'
+            path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{self._count:04d}-{safe_name}.prof")
+            out = self.out or sys.stderr
+            try:
+                profiler.dump_stats(path)
+            except OSError as e:
+                print(f"profile: {path}: {e.strerror or e}", file=out)
+                path = None
+            stats = pstats.Stats(profiler, stream=out)
+            stats.sort_stats('cumulative').print_stats(self.top)
+            if path:
+                print(f"📊 profile saved to {path}", file=out)
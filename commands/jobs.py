@@ -0,0 +1,314 @@
+import asyncio
+import concurrent.futures
+import ctypes
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from commands.cancel import cancel_scope
+from commands.pipeline import PipelineRunner, Stage, exit_status, thread_stdout, thread_streams
+from commands.progress import format_duration
+
+def _elapsed_text(seconds: float) -> str:
+    return f"{seconds:.1f}s" if seconds < 60 else format_duration(seconds)
+
+def parse_signal(spec: str) -> signal.Signals:
+    """``TERM``, ``SIGTERM`` or ``15`` → signal.SIGTERM; raises ValueError"""
+    if spec.isdigit():
+        return signal.Signals(int(spec))
+    name = spec.upper()
+    if not name.startswith('SIG'):
+        name = 'SIG' + name
+    try:
+        return signal.Signals[name]
+    except KeyError:
+        raise ValueError(f"{spec}: invalid signal specification") from None
+
+_SIGNAL_NAMES = {signal.SIGINT: "Interrupted", signal.SIGTERM: "Terminated", signal.SIGKILL: "Killed"}
+_STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGKILL, signal.SIGHUP, signal.SIGQUIT)
+
+class _BackgroundOutput:
+    """The terminal as a background job sees it: written to as usual, but not a TTY,
+    so builtins don't page or draw progress lines over the prompt"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def isatty(self) -> bool:
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+class Job:
+    def __init__(self, job_id: int, command: str):
+        self.id = job_id
+        self.command = command
+        self.state = 'Running'
+        self.status: Optional[int] = None
+        self.started = time.monotonic()
+        self.ended: Optional[float] = None
+        self.future: Optional[concurrent.futures.Future] = None
+        self.processes: List = []
+        self.runner: Optional[PipelineRunner] = None
+        self.thread_id: Optional[int] = None
+        self.foreground = False
+        self.started_event = threading.Event()
+        self.cancel = threading.Event()  # asks the job's builtins to stop
+
+    @property
+    def elapsed(self) -> float:
+        return (self.ended or time.monotonic()) - self.started
+
+    @property
+    def done(self) -> bool:
+        return self.status is not None
+
+    def pids(self) -> List[int]:
+        processes = self.runner.processes if self.runner is not None else self.processes
+        return [proc.pid for proc in processes if proc is not None and proc.returncode is None]
+
+    def describe(self) -> str:
+        if not self.done:
+            return self.state
+        if self.status == 0:
+            return "Done"
+        if self.status > 128 and self.status - 128 in signal.valid_signals():
+            sig = signal.Signals(self.status - 128)
+            return _SIGNAL_NAMES.get(sig, sig.name)
+        return f"Exit {self.status}"
+
+class JobManager:
+    """Background jobs on an asyncio event loop.
+
+    The loop runs in a daemon thread, so the prompt never waits for it. Jobs
+    made only of external programs are started as asyncio subprocesses and
+    awaited on the loop; jobs involving builtins run in the loop's thread pool
+    (through :class:`PipelineRunner` for pipelines). Finished jobs are queued
+    until :meth:`notify` reports them, normally just before the next prompt.
+    """
+
+    def __init__(self, is_builtin: Callable[..., bool], run_builtin: Callable[[List[str]], Optional[int]],
+                 max_workers: int = 32):
+        self.is_builtin = is_builtin
+        self.run_builtin = run_builtin
+        self._jobs: Dict[int, Job] = {}
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job"))
+        threading.Thread(target=self._loop.run_forever, name="jobs-loop", daemon=True).start()
+
+    def submit(self, command: str, stages: List[Stage], cwd: str) -> Job:
+        """Start ``stages`` in the background, announce it and return the new job"""
+        with self._lock:
+            job = Job(max(self._jobs, default=0) + 1, command)
+            self._jobs[job.id] = job
+        print(f"[{job.id}] {command}", flush=True)
+        job.future = asyncio.run_coroutine_threadsafe(self._run(job, stages, cwd), self._loop)
+        return job
+
+    async def _run(self, job: Job, stages: List[Stage], cwd: str) -> int:
+        try:
+            if any(self.is_builtin(stage.argv[0], stage.argv[1:]) for stage in stages):
+                status = await self._loop.run_in_executor(None, self._run_in_thread, job, stages, cwd)
+            else:
+                status = await self._spawn(job, stages, cwd)
+        except Exception as e:
+            print(f"\n[{job.id}] {e}")
+            status = 1
+        finally:
+            job.started_event.set()
+        job.ended = time.monotonic()
+        job.status = status
+        return status
+
+    async def _spawn(self, job: Job, stages: List[Stage], cwd: str) -> int:
+        """Run a pipeline of external programs as asyncio subprocesses"""
+        def open_redirect(path, flags):
+            return os.open(os.path.join(cwd, os.path.expanduser(path)), flags, 0o666)
+
+        pending_fds: List[int] = []
+        prev_read: Optional[int] = None
+        try:
+            for index, stage in enumerate(stages):
+                in_fd, prev_read = prev_read, None
+                if stage.stdin_path is not None:
+                    if in_fd is not None:
+                        os.close(in_fd)
+                        pending_fds.remove(in_fd)
+                    in_fd = open_redirect(stage.stdin_path, os.O_RDONLY)
+                    pending_fds.append(in_fd)
+                out_fd = None
+                if stage.stdout_path is not None:
+                    flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if stage.append else os.O_TRUNC)
+                    out_fd = open_redirect(stage.stdout_path, flags)
+                    pending_fds.append(out_fd)
+                if index < len(stages) - 1:
+                    read_fd, write_fd = os.pipe()
+                    pending_fds.append(read_fd)
+                    prev_read = read_fd
+                    if out_fd is None:
+                        out_fd = write_fd
+                        pending_fds.append(write_fd)
+                    else:
+                        os.close(write_fd)
+                proc = await asyncio.create_subprocess_exec(
+                    *stage.argv, cwd=cwd, stdin=in_fd if in_fd is not None else asyncio.subprocess.DEVNULL,
+                    stdout=out_fd, start_new_session=True)
+                job.processes.append(proc)
+                for fd in (in_fd, out_fd):
+                    if fd is not None:
+                        os.close(fd)
+                        pending_fds.remove(fd)
+        except OSError:
+            for proc in job.processes:
+                proc.kill()
+            await asyncio.gather(*(proc.wait() for proc in job.processes))
+            raise
+        finally:
+            for fd in pending_fds:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        job.started_event.set()
+        codes = await asyncio.gather(*(proc.wait() for proc in job.processes))
+        return exit_status(codes[-1])
+
+    def _run_in_thread(self, job: Job, stages: List[Stage], cwd: str) -> int:
+        job.thread_id = threading.get_ident()
+        job.started_event.set()
+        try:
+            with cancel_scope(job.cancel), thread_streams(stdout=_BackgroundOutput(thread_stdout())):
+                if len(stages) == 1 and not stages[0].redirected:
+                    with open(os.devnull) as devnull, thread_streams(stdin=devnull):
+                        return self.run_builtin(stages[0].argv) or 0
+                job.runner = PipelineRunner(self.is_builtin, self.run_builtin, cwd, background=True)
+                return exit_status(job.runner.run(stages))
+        except KeyboardInterrupt:
+            return 130
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 1
+        except BrokenPipeError:
+            return 141
+        finally:
+            job.thread_id = None
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def current(self) -> Optional[Job]:
+        """Most recently started job, the one ``%%`` and a bare ``fg`` mean"""
+        with self._lock:
+            return self._jobs[max(self._jobs)] if self._jobs else None
+
+    def find(self, spec: str) -> Optional[Job]:
+        """Look up ``%N``, ``N``, ``%%`` or ``%+``"""
+        if spec in ('%', '%%', '%+'):
+            return self.current()
+        try:
+            job_id = int(spec[1:] if spec.startswith('%') else spec)
+        except ValueError:
+            return None
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def signal(self, job: Job, sig: int) -> bool:
+        """Send ``sig`` to the job; returns False if it has nothing to signal.
+
+        External programs get the signal itself. A builtin running in a
+        worker thread can't receive signals, so stop-type signals set the
+        job's cancel event, which the copy and delete engines poll even
+        while they wait on their workers. Builtins that don't poll it
+        also get a KeyboardInterrupt raised in their thread, which only
+        arrives once that thread runs Python code again.
+        """
+        job.started_event.wait(1.0)
+        if job.done:
+            return False
+        delivered = False
+        for pid in job.pids():
+            try:
+                os.kill(pid, sig)
+                delivered = True
+            except ProcessLookupError:
+                pass
+        if sig in _STOP_SIGNALS:
+            job.cancel.set()
+            thread_id = job.thread_id
+            if thread_id is not None:
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread_id),
+                                                           ctypes.py_object(KeyboardInterrupt))
+                delivered = True
+        if delivered and sig in (signal.SIGSTOP, signal.SIGTSTP, signal.SIGTTIN, signal.SIGTTOU):
+            job.state = 'Stopped'
+        elif delivered and sig == signal.SIGCONT:
+            job.state = 'Running'
+        return delivered
+
+    def foreground(self, job: Job) -> int:
+        """Wait for ``job`` in the foreground; Ctrl+C interrupts it, Ctrl+Z stops it"""
+        job.foreground = True
+        if job.state == 'Stopped':
+            self.signal(job, signal.SIGCONT)
+        suspended = threading.Event()
+
+        def on_tstp(signum, frame):
+            suspended.set()
+
+        previous = None
+        if hasattr(signal, 'SIGTSTP') and threading.current_thread() is threading.main_thread():
+            previous = signal.signal(signal.SIGTSTP, on_tstp)
+        try:
+            while True:
+                try:
+                    status = job.future.result(timeout=0.2)
+                    self._forget(job)
+                    return status
+                except concurrent.futures.TimeoutError:
+                    pass
+                except KeyboardInterrupt:
+                    print()
+                    self.signal(job, signal.SIGINT)
+                if suspended.is_set():
+                    job.foreground = False
+                    if self.signal(job, signal.SIGSTOP):
+                        print(f"\n[{job.id}]+ Stopped  {job.command}")
+                    else:
+                        print(f"\n[{job.id}]+ Running in background  {job.command}")
+                    return 148
+        finally:
+            if previous is not None:
+                signal.signal(signal.SIGTSTP, previous)
+
+    def wait(self, job: Optional[Job] = None) -> int:
+        """Wait for one job, or for every job; returns the last status"""
+        status = 0
+        for waited in ([job] if job is not None else self.jobs()):
+            if waited.state == 'Stopped':
+                continue
+            status = waited.future.result()
+        return status
+
+    def _forget(self, job: Job):
+        with self._lock:
+            self._jobs.pop(job.id, None)
+
+    def notify(self, out=None):
+        """Report jobs that finished since the last call and drop them"""
+        with self._lock:
+            finished = [job for job in self._jobs.values() if job.done and not job.foreground]
+            for job in finished:
+                del self._jobs[job.id]
+        for job in finished:
+            icon = "✅" if job.status == 0 else "❌"
+            print(f"[{job.id}] {icon} {job.describe()} after {_elapsed_text(job.elapsed)}  {job.command}", file=out)
+
+    def format_job(self, job: Job, show_pids: bool = False) -> str:
+        marker = '+' if job is self.current() else ' '
+        pids = f" {','.join(map(str, job.pids()))}" if show_pids else ''
+        return f"[{job.id}]{marker}{pids} {job.describe():<10} {_elapsed_text(job.elapsed):>8}  {job.command}"
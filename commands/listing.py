@@ -0,0 +1,175 @@
+import json
+import os
+import stat
+import sys
+import time
+from functools import lru_cache
+from typing import Iterator, List, Optional
+
+try:
+    import grp
+    import pwd
+except ImportError:  # Windows
+    grp = None
+    pwd = None
+
+SIX_MONTHS = 182 * 24 * 3600
+_TYPES = {stat.S_IFREG: 'file', stat.S_IFDIR: 'directory', stat.S_IFLNK: 'symlink', stat.S_IFIFO: 'fifo',
+          stat.S_IFSOCK: 'socket', stat.S_IFCHR: 'char_device', stat.S_IFBLK: 'block_device'}
+
+@lru_cache(maxsize=None)
+def _owner(uid: int) -> str:
+    try:
+        return pwd.getpwuid(uid).pw_name if pwd else str(uid)
+    except KeyError:
+        return str(uid)
+
+@lru_cache(maxsize=None)
+def _group(gid: int) -> str:
+    try:
+        return grp.getgrgid(gid).gr_name if grp else str(gid)
+    except KeyError:
+        return str(gid)
+
+class DirectoryLister:
+    """``ls`` engine built on ``os.scandir``.
+
+    Sorting by size or time and the long format use the stat result cached on
+    each ``DirEntry``. Output is collected and written in bulk every
+    ``batch_size`` entries. With ``sort=None`` (``-U``) entries are written as
+    they are read, so huge directories start printing immediately. Recursive
+    listings walk one directory at a time. With ``json_output`` every entry is
+    a JSON record and the listing is one JSON array, closed by :meth:`finish`.
+    """
+
+    def __init__(self, long: bool = False, show_all: bool = False, recursive: bool = False,
+                 sort: Optional[str] = 'name', reverse: bool = False, out=None, batch_size: int = 4096,
+                 json_output: bool = False):
+        self.long = long
+        self.show_all = show_all
+        self.recursive = recursive
+        self.sort = sort
+        self.reverse = reverse
+        self.out = out or sys.stdout
+        self.batch_size = batch_size
+        self._buffer: List[str] = []
+        self._now = time.time()
+        self._first_header = True
+        self.json_output = json_output
+        self._records = 0
+        # Like ls, put one name per line when the output isn't a terminal
+        self._separator = "  " if self.out.isatty() else "\n"
+
+    def _emit(self, text: str):
+        self._buffer.append(text)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.out.write(''.join(self._buffer))
+            self._buffer.clear()
+        self.out.flush()
+
+    def _entries(self, path: str) -> Iterator[os.DirEntry]:
+        with os.scandir(path) as it:
+            for entry in it:
+                if self.show_all or not entry.name.startswith('.'):
+                    yield entry
+
+    def _sorted(self, path: str):
+        entries = self._entries(path)
+        if self.sort is None:
+            return entries
+        if self.sort == 'size':
+            key = lambda e: (-self._stat(e).st_size, e.name)
+        elif self.sort == 'time':
+            key = lambda e: (-self._stat(e).st_mtime, e.name)
+        else:
+            key = lambda e: e.name
+        return sorted(entries, key=key, reverse=self.reverse)
+
+    @staticmethod
+    def _stat(entry: os.DirEntry) -> os.stat_result:
+        try:
+            return entry.stat(follow_symlinks=False)
+        except OSError:
+            return os.stat_result((0,) * 10)
+
+    def _long_line(self, name: str, st: os.stat_result, path: str) -> str:
+        mtime = st.st_mtime
+        fmt = "%b %d %H:%M" if abs(self._now - mtime) < SIX_MONTHS else "%b %d  %Y"
+        line = (f"{stat.filemode(st.st_mode)} {st.st_nlink:>3} {_owner(st.st_uid):<8} {_group(st.st_gid):<8} "
+                f"{st.st_size:>10} {time.strftime(fmt, time.localtime(mtime))} {name}")
+        if stat.S_ISLNK(st.st_mode):
+            try:
+                line += f" -> {os.readlink(path)}"
+            except OSError:
+                pass
+        return line + "\n"
+
+    def _record(self, name: str, st: os.stat_result, path: str) -> str:
+        record = {'name': name, 'path': path, 'type': _TYPES.get(stat.S_IFMT(st.st_mode), 'other'),
+                  'size': st.st_size, 'mode': stat.filemode(st.st_mode), 'nlink': st.st_nlink,
+                  'owner': _owner(st.st_uid), 'group': _group(st.st_gid), 'mtime': st.st_mtime}
+        if stat.S_ISLNK(st.st_mode):
+            try:
+                record['target'] = os.readlink(path)
+            except OSError:
+                record['target'] = None
+        self._records += 1
+        return (',\n' if self._records > 1 else '[') + json.dumps(record, ensure_ascii=False)
+
+    def _error(self, message: str):
+        if self.json_output:
+            self.flush()
+            print(message, file=sys.stderr)
+        else:
+            self._emit(message + "\n")
+
+    def finish(self):
+        """Close the JSON array (nothing to do for text output)"""
+        if self.json_output:
+            self._emit(']\n' if self._records else '[]\n')
+        self.flush()
+
+    def list_file(self, path: str, name: str):
+        if self.json_output:
+            self._emit(self._record(name, os.lstat(path), path))
+        elif self.long:
+            self._emit(self._long_line(name, os.lstat(path), path))
+        else:
+            self._emit(f"{name}\n")
+
+    def list_dir(self, path: str, header: bool = False):
+        """List ``path`` (and, with ``recursive``, everything below it)"""
+        pending = [path]
+        while pending:
+            directory = pending.pop()
+            if (header or self.recursive) and not self.json_output:
+                separator = '' if self._first_header else '\n'
+                self._emit(f"{separator}{directory}:\n")
+                self._first_header = False
+            subdirs = []
+            count = 0
+            try:
+                for entry in self._sorted(directory):
+                    if self.json_output:
+                        self._emit(self._record(entry.name, self._stat(entry), entry.path))
+                    elif self.long:
+                        self._emit(self._long_line(entry.name, self._stat(entry), entry.path))
+                    else:
+                        self._emit(entry.name + self._separator)
+                    count += 1
+                    if self.recursive and entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+            except BrokenPipeError:
+                raise
+            except PermissionError:
+                self._error(f"ls: {directory}: Permission denied")
+            except OSError as e:
+                self._error(f"ls: {directory}: {e.strerror or e}")
+            if count and not self.long and not self.json_output and self._separator != "\n":
+                self._emit("\n")
+            pending.extend(reversed(subdirs))
+        self.flush()
@@ -0,0 +1,233 @@
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
+
+from commands.pipeline import thread_stdout, thread_streams
+
+FLUSH_BYTES = 64 * 1024
+TTY_FLUSH_INTERVAL = 0.05
+PAGE_HOLD_LIMIT = 0.1
+# Home, erase the screen, then the scrollback
+CLEAR_SCREEN = "\x1b[H\x1b[2J\x1b[3J"
+
+def _pager_argv() -> Optional[List[str]]:
+    pager = os.environ.get('PAGER')
+    if pager:
+        return shlex.split(pager)
+    for argv in (['less', '-R'], ['more']):
+        if shutil.which(argv[0]):
+            return argv
+    return None
+
+class _SinkBuffer:
+    """Byte interface of an OutputSink, for builtins that write bytes (cat, head, grep)"""
+
+    def __init__(self, sink: 'OutputSink'):
+        self._sink = sink
+
+    def write(self, data) -> int:
+        return self._sink.write_bytes(bytes(data))
+
+    def flush(self):
+        self._sink.flush()
+
+class OutputSink:
+    """Batching stand-in for a builtin's stdout, optionally paged.
+
+    Text and byte writes are gathered into one buffer and written to the
+    underlying stream in blocks of ``FLUSH_BYTES`` instead of one write per
+    ``print``. On a terminal, buffered output is also written out
+    ``TTY_FLUSH_INTERVAL`` seconds after it arrived, by a timer if the
+    command goes quiet, so slow commands still stream.
+
+    With ``page`` on, output is held back while the command fills the first
+    screen. If it overflows within ``PAGE_HOLD_LIMIT`` seconds, a pager
+    (``$PAGER``, else ``less -R``) is started and fed everything from then on.
+    Otherwise (it ended, or is producing output slowly, like a ``grep -r``
+    finding a match now and then) the output is released and streams as usual.
+    """
+
+    def __init__(self, target, page: bool = False):
+        self.target = target
+        self.buffer = _SinkBuffer(self)
+        self.encoding = getattr(target, 'encoding', None) or 'utf-8'
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self._tty = target.isatty()
+        self._last_drain = time.monotonic()
+        self._holding = page and self._tty
+        self._hold_until = self._last_drain + PAGE_HOLD_LIMIT
+        self._lock = threading.RLock()  # the flush timer drains from its own thread
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+        self._newlines = 0
+        self._rows, self._columns = 0, 0
+        if self._holding:
+            size = shutil.get_terminal_size()
+            self._rows, self._columns = size.lines - 1, size.columns
+        self.pager: Optional[subprocess.Popen] = None
+
+    def write(self, text: str) -> int:
+        try:
+            data = text.encode(self.encoding, 'surrogateescape')
+        except UnicodeEncodeError:
+            data = text.encode(self.encoding, 'replace')
+        self.write_bytes(data)
+        return len(text)
+
+    def write_bytes(self, data: bytes) -> int:
+        with self._lock:
+            self._chunks.append(data)
+            self._size += len(data)
+            now = time.monotonic()
+            if self._holding:
+                self._newlines += data.count(b'\n')
+                if self._newlines >= self._rows or self._size >= self._rows * self._columns:
+                    self._start_pager()
+                elif now >= self._hold_until:
+                    self._holding = False
+                    self._drain()
+                else:
+                    self._schedule(self._hold_until - now)
+            elif self._size >= FLUSH_BYTES or (self._tty and now - self._last_drain >= TTY_FLUSH_INTERVAL):
+                self._drain()
+            elif self._tty:
+                self._schedule(TTY_FLUSH_INTERVAL)
+        return len(data)
+
+    def _schedule(self, delay: float):
+        if self._timer is None:
+            self._timer = threading.Timer(delay, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            if self._closed:
+                return
+            self._holding = False
+            try:
+                self._drain(flush=True)
+            except OSError:
+                pass  # the command's next write or close() runs into it too
+
+    def _start_pager(self):
+        self._holding = False
+        argv = _pager_argv()
+        if argv is not None:
+            self.target.flush()
+            try:
+                self.pager = subprocess.Popen(argv, stdin=subprocess.PIPE)
+            except OSError:
+                self.pager = None
+        self._drain()
+
+    def _drain(self, flush: bool = False):
+        self._last_drain = time.monotonic()
+        if not self._chunks:
+            if flush and self.pager is None:
+                self.target.flush()
+            return
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        self._size = 0
+        if self.pager is not None:
+            self.pager.stdin.write(data)
+            if flush:
+                self.pager.stdin.flush()
+            return
+        self.target.flush()
+        self.target.buffer.write(data)
+        if flush or self._tty:
+            self.target.buffer.flush()
+
+    def flush(self):
+        with self._lock:
+            # While deciding whether to page, nothing is shown yet
+            if not self._holding:
+                self._drain(flush=True)
+            elif time.monotonic() >= self._hold_until:
+                self._holding = False
+                self._drain(flush=True)
+
+    def close(self):
+        """Write out what is left and, if a pager was started, wait for the user to quit it"""
+        with self._lock:
+            self._closed = True
+            self._holding = False
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        try:
+            self._drain(flush=True)
+        except BrokenPipeError:
+            if self.pager is None:
+                raise
+        finally:
+            if self.pager is not None:
+                try:
+                    self.pager.stdin.close()
+                except BrokenPipeError:
+                    pass
+                while True:
+                    try:
+                        self.pager.wait()
+                        break
+                    except KeyboardInterrupt:
+                        pass  # the pager handles Ctrl+C itself
+
+    def isatty(self) -> bool:
+        return self._tty
+
+    def writable(self) -> bool:
+        return True
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+@contextmanager
+def output_sink(page: bool = False):
+    """Route this thread's sys.stdout through an OutputSink for the duration.
+
+    If the reader goes away (the user quit the pager, or ``| head`` exited)
+    the BrokenPipeError ends the command quietly when a pager was showing it.
+    """
+    target = thread_stdout()
+    if isinstance(target, OutputSink):
+        yield target
+        return
+    sink = OutputSink(target, page=page and threading.current_thread() is threading.main_thread())
+    try:
+        with thread_streams(stdout=sink):
+            yield sink
+    except BrokenPipeError:
+        if sink.pager is None:
+            raise
+    finally:
+        sink.close()
+
+def write_json(data, out=None):
+    """Write ``data`` as one JSON document (non-JSON values such as datetimes become strings)"""
+    (out or sys.stdout).write(json.dumps(data, default=str, ensure_ascii=False) + '\n')
+
+def write_json_records(records: Iterable[dict], out=None, batch: int = 1000):
+    """Write ``records`` as a JSON array, one record per line, without building it in memory"""
+    out = out or sys.stdout
+    pending = []
+    separator = '['
+    for record in records:
+        pending.append(separator + json.dumps(record, default=str, ensure_ascii=False))
+        separator = ',\n'
+        if len(pending) >= batch:
+            out.write(''.join(pending))
+            pending.clear()
+    pending.append(']\n' if separator != '[' else '[]\n')
+    out.write(''.join(pending))
@@ -0,0 +1,270 @@
+import io
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+from commands.cancel import cancel_event, cancel_scope
+
+class Stage:
+    """One command of a pipeline with its redirections"""
+
+    def __init__(self, argv: List[str]):
+        self.argv = argv
+        self.stdin_path: Optional[str] = None
+        self.stdout_path: Optional[str] = None
+        self.append = False
+
+    @property
+    def redirected(self) -> bool:
+        return self.stdin_path is not None or self.stdout_path is not None
+
+def parse_pipeline(command: str) -> List[Stage]:
+    """Split ``a | b > out`` into stages; raises ValueError on bad syntax"""
+    lexer = shlex.shlex(command, posix=True, punctuation_chars='|<>')
+    lexer.whitespace_split = True
+    tokens = list(lexer)
+    stages = [Stage([])]
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        stage = stages[-1]
+        if token == '|':
+            if not stage.argv:
+                raise ValueError("syntax error near '|'")
+            stages.append(Stage([]))
+        elif token in ('>', '>>', '<'):
+            if i + 1 >= len(tokens) or tokens[i + 1] in ('|', '>', '>>', '<'):
+                raise ValueError(f"syntax error near '{token}'")
+            i += 1
+            if token == '<':
+                stage.stdin_path = tokens[i]
+            else:
+                stage.stdout_path = tokens[i]
+                stage.append = token == '>>'
+        elif token and set(token) <= set('|<>'):
+            raise ValueError(f"syntax error near '{token}'")
+        else:
+            stage.argv.append(token)
+        i += 1
+    if not stages[-1].argv:
+        if len(stages) > 1:
+            raise ValueError("syntax error: missing command after '|'")
+        return []
+    return stages
+
+def split_background(command: str) -> Tuple[str, bool]:
+    """Strip an unquoted trailing ``&``; returns the command and whether it was there"""
+    lexer = shlex.shlex(command, posix=False, punctuation_chars='|<>&')
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return command, False  # unbalanced quotes, let parse_pipeline report it
+    if tokens and tokens[-1] == '&':
+        return command.rstrip()[:-1].rstrip(), True
+    return command, False
+
+
+def exit_status(returncode: int) -> int:
+    """Shell-style status: processes killed by signal N report 128 + N"""
+    return 128 - returncode if returncode < 0 else returncode
+
+
+class _ThreadLocalStream:
+    """Stand-in for sys.stdin/sys.stdout that can be redirected per thread.
+
+    Builtins write with plain ``print``; installing this proxy lets a builtin
+    running in a pipeline thread write into its pipe while the rest of the
+    terminal keeps using the real stream.
+    """
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def _target(self):
+        return getattr(self._local, 'stream', None) or self._default
+
+    def write(self, data):
+        return self._target().write(data)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+_install_lock = threading.Lock()
+
+def install_stream_proxies():
+    """Replace sys.stdin/sys.stdout with per-thread redirectable proxies (once)"""
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadLocalStream):
+            sys.stdout = _ThreadLocalStream(sys.stdout)
+        if not isinstance(sys.stdin, _ThreadLocalStream):
+            sys.stdin = _ThreadLocalStream(sys.stdin)
+
+def thread_stdout():
+    """The stream sys.stdout currently writes to on this thread"""
+    install_stream_proxies()
+    return sys.stdout._target()
+
+@contextmanager
+def thread_streams(stdin=None, stdout=None):
+    """Point this thread's sys.stdin/sys.stdout at other streams"""
+    install_stream_proxies()
+    saved = (getattr(sys.stdin._local, 'stream', None), getattr(sys.stdout._local, 'stream', None))
+    if stdin is not None:
+        sys.stdin._local.stream = stdin
+    if stdout is not None:
+        sys.stdout._local.stream = stdout
+    try:
+        yield
+    finally:
+        sys.stdin._local.stream, sys.stdout._local.stream = saved
+
+
+class PipelineRunner:
+    """Run a pipeline of builtins and external programs over OS pipes.
+
+    Adjacent stages are joined with ``os.pipe``. External programs get the
+    pipe file descriptors directly, so data between two of them never passes
+    through Python. Builtins run in threads with their sys.stdin/sys.stdout
+    pointed at the pipe ends, which makes them streaming byte producers and
+    consumers. The last stage runs on the calling thread when it is a builtin.
+
+    With ``background=True`` the pipeline reads /dev/null instead of the
+    terminal and external programs start in their own session, so Ctrl+C at
+    the prompt doesn't reach them. ``processes`` holds the started programs
+    while :meth:`run` is in progress. Builtin stages share the creating
+    thread's :func:`~commands.cancel.cancel_event`, which Ctrl+C sets.
+    """
+
+    def __init__(self, is_builtin: Callable[..., bool], run_builtin: Callable[[List[str]], Optional[int]],
+                 cwd: str, background: bool = False):
+        self.is_builtin = is_builtin
+        self.run_builtin = run_builtin
+        self.cwd = cwd
+        self.background = background
+        self.processes: List[Optional[subprocess.Popen]] = []
+        self.cancel = cancel_event()
+
+    @staticmethod
+    def find_missing(stages: List[Stage], is_builtin: Callable[[str], bool]) -> Optional[str]:
+        """First command that is neither a builtin nor found on PATH"""
+        for stage in stages:
+            name = stage.argv[0]
+            if not is_builtin(name) and shutil.which(name) is None:
+                return name
+        return None
+
+    def _open_redirect(self, path: str, flags: int) -> int:
+        return os.open(os.path.join(self.cwd, os.path.expanduser(path)), flags, 0o666)
+
+    def run(self, stages: List[Stage]) -> int:
+        install_stream_proxies()
+        sys.stdout.flush()
+        threads: List[threading.Thread] = []
+        processes = self.processes = []
+        statuses = [0] * len(stages)
+        pending_fds: List[int] = []
+        last_builtin = None
+        prev_read: Optional[int] = None
+        try:
+            for index, stage in enumerate(stages):
+                in_fd = prev_read
+                prev_read = None
+                if stage.stdin_path is not None:
+                    if in_fd is not None:
+                        os.close(in_fd)
+                    in_fd = self._open_redirect(stage.stdin_path, os.O_RDONLY)
+                elif in_fd is None and self.background:
+                    in_fd = os.open(os.devnull, os.O_RDONLY)
+                if in_fd is not None:
+                    pending_fds.append(in_fd)
+
+                out_fd = None
+                if stage.stdout_path is not None:
+                    flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if stage.append else os.O_TRUNC)
+                    out_fd = self._open_redirect(stage.stdout_path, flags)
+                    pending_fds.append(out_fd)
+                if index < len(stages) - 1:
+                    read_fd, write_fd = os.pipe()
+                    pending_fds.append(read_fd)
+                    prev_read = read_fd
+                    if out_fd is None:
+                        out_fd = write_fd
+                        pending_fds.append(write_fd)
+                    else:
+                        os.close(write_fd)  # "a > f | b": b reads nothing
+
+                if self.is_builtin(stage.argv[0], stage.argv[1:]):
+                    # The builtin takes ownership of its descriptors
+                    for fd in (in_fd, out_fd):
+                        if fd is not None:
+                            pending_fds.remove(fd)
+                    if index == len(stages) - 1:
+                        last_builtin = (index, stage.argv, in_fd, out_fd)
+                    else:
+                        thread = threading.Thread(target=self._builtin_stage, daemon=True,
+                                                  args=(index, stage.argv, in_fd, out_fd, statuses))
+                        thread.start()
+                        threads.append(thread)
+                    processes.append(None)
+                else:
+                    try:
+                        proc = subprocess.Popen(stage.argv, cwd=self.cwd, stdin=in_fd, stdout=out_fd,
+                                                start_new_session=self.background)
+                    except (FileNotFoundError, PermissionError) as e:
+                        print(f"{stage.argv[0]}: {'command not found' if isinstance(e, FileNotFoundError) else 'permission denied'}")
+                        statuses[index] = 127 if isinstance(e, FileNotFoundError) else 126
+                        proc = None
+                    processes.append(proc)
+                    for fd in (in_fd, out_fd):
+                        if fd is not None:
+                            os.close(fd)
+                            pending_fds.remove(fd)
+
+            if last_builtin is not None:
+                self._builtin_stage(*last_builtin, statuses)
+            for index, proc in enumerate(processes):
+                if proc is not None:
+                    statuses[index] = proc.wait()
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.cancel.set()
+            for proc in processes:
+                if proc is not None and proc.poll() is None:
+                    proc.terminate()
+            statuses[-1] = 130
+            print()
+        finally:
+            for fd in pending_fds:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        return statuses[-1]
+
+    def _builtin_stage(self, index: int, argv: List[str], in_fd: Optional[int], out_fd: Optional[int],
+                       statuses: List[int]):
+        stdin = io.TextIOWrapper(os.fdopen(in_fd, 'rb'), encoding='utf-8', errors='replace') if in_fd is not None else None
+        stdout = io.TextIOWrapper(os.fdopen(out_fd, 'wb'), encoding='utf-8', errors='replace') if out_fd is not None else None
+        try:
+            with cancel_scope(self.cancel), thread_streams(stdin, stdout):
+                statuses[index] = self.run_builtin(argv) or 0
+        except BrokenPipeError:
+            statuses[index] = 141
+        finally:
+            for stream in (stdout, stdin):
+                if stream is not None:
+                    try:
+                        stream.close()
+                    except OSError:
+                        pass
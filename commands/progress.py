@@ -0,0 +1,83 @@
+import sys
+import threading
+import time
+from typing import Optional
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if abs(size) < 1024 or unit == 'TB':
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02}:{rest % 60:02}" if hours else f"{rest // 60}:{rest % 60:02}"
+
+class ProgressLine:
+    """Thread-safe counters rendered as one self-overwriting status line.
+
+    Workers call :meth:`add`; a reporter thread redraws the line every
+    ``interval`` seconds, so the hot path only takes a lock and adds two ints.
+    Nothing is drawn unless stdout is a TTY.
+    """
+
+    def __init__(self, label: str, interval: float = 0.5, out=None):
+        self.label = label
+        self.interval = interval
+        self.out = out or sys.stdout
+        self.files = 0
+        self.bytes = 0
+        self.total_files: Optional[int] = None
+        self.total_bytes: Optional[int] = None
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._width = 0
+
+    def add(self, files: int = 0, nbytes: int = 0):
+        with self._lock:
+            self.files += files
+            self.bytes += nbytes
+
+    def set_totals(self, files: int, nbytes: int):
+        self.total_files = files
+        self.total_bytes = nbytes
+
+    def start(self):
+        self.started = time.monotonic()
+        if self.out.isatty():
+            self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            self._draw()
+
+    def status(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = self.bytes / elapsed
+        text = f"{self.label}: {self.files:,} files  {format_bytes(self.bytes)}"
+        if self.total_bytes is not None:
+            text += f"/{format_bytes(self.total_bytes)}"
+        text += f"  {format_bytes(rate)}/s"
+        if self.total_bytes is not None and rate > 0:
+            text += f"  ETA {format_duration(max(0, self.total_bytes - self.bytes) / rate)}"
+        elif self.total_bytes is None:
+            text += "  ETA ?"
+        return text
+
+    def _draw(self):
+        text = self.status()
+        self.out.write('\r' + text.ljust(self._width))
+        self.out.flush()
+        self._width = len(text)
+
+    def finish(self):
+        self._done.set()
+        if self._thread is not None:
+            self._thread.join()
+            self.out.write('\r' + ' ' * self._width + '\r')
+            self.out.flush()
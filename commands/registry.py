@@ -0,0 +1,98 @@
+import importlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+Handler = Callable[[object, List[str]], Optional[int]]
+
+class CommandRegistry:
+    """Command name → handler table with lazily imported handlers.
+
+    Handlers are registered either as callables taking ``(terminal, args)``
+    or as a ``"module:attr.path"`` string plus the argument convention of the
+    target. String targets are imported the first time the command runs, so
+    heavy modules such as psutil stay unloaded until a command needs them.
+
+    A builtin that shadows a system program can also name an ``accepts``
+    check, ``args -> bool`` (imported the same way). When it returns False
+    the terminal runs the program from PATH instead, so options the builtin
+    doesn't implement keep working.
+    """
+
+    CONVENTIONS = {
+        'cwd_args': lambda func, terminal, args: func(terminal.current_dir, args),
+        'cwd': lambda func, terminal, args: func(terminal.current_dir),
+        'args': lambda func, terminal, args: func(args),
+        'none': lambda func, terminal, args: func(),
+    }
+
+    def __init__(self):
+        self._specs: Dict[str, Tuple[str, str]] = {}
+        self._handlers: Dict[str, Handler] = {}
+        self._accepts: Dict[str, object] = {}
+
+    def register(self, name: str, target, convention: str = 'cwd_args', accepts=None):
+        if accepts is not None:
+            self._accepts[name] = accepts
+        else:
+            self._accepts.pop(name, None)
+        if callable(target):
+            self._specs.pop(name, None)
+            self._handlers[name] = target
+        else:
+            if convention not in self.CONVENTIONS:
+                raise ValueError(f"unknown calling convention: {convention}")
+            self._specs[name] = (target, convention)
+            self._handlers.pop(name, None)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._handlers or name in self._specs
+
+    def names(self) -> List[str]:
+        return sorted(set(self._handlers) | set(self._specs))
+
+    def accepts(self, name: str, args: List[str]) -> bool:
+        """Whether builtin ``name`` handles ``args`` itself"""
+        check = self._accepts.get(name)
+        if check is None:
+            return True
+        if isinstance(check, str):
+            check = self._accepts[name] = self._resolve(check)
+        return check(args)
+
+    def get(self, name: str) -> Optional[Handler]:
+        handler = self._handlers.get(name)
+        if handler is None:
+            spec = self._specs.get(name)
+            if spec is None:
+                return None
+            handler = self._handlers[name] = self._load(*spec)
+        return handler
+
+    @staticmethod
+    def _resolve(target: str):
+        module_name, _, attr_path = target.partition(':')
+        func = importlib.import_module(module_name)
+        for attr in attr_path.split('.'):
+            func = getattr(func, attr)
+        return func
+
+    def _load(self, target: str, convention: str) -> Handler:
+        func = self._resolve(target)
+        adapt = self.CONVENTIONS[convention]
+        return lambda terminal, args: adapt(func, terminal, args)
+
+
+_METHODS = 'commands.core_commands:CommandMethods.'
+
+def default_registry() -> CommandRegistry:
+    """Registry with the CommandMethods builtins"""
+    registry = CommandRegistry()
+    for name in ('ls', 'mkdir', 'rmdir', 'rm', 'touch', 'cat', 'head', 'tail', 'cp', 'mv', 'df', 'du'):
+        registry.register(name, f'{_METHODS}cmd_{name}', 'cwd_args')
+    for name in ('find', 'grep'):
+        registry.register(name, f'{_METHODS}cmd_{name}', 'cwd_args', accepts=f'commands.search:{name}_accepts')
+    for name in ('echo', 'ps', 'top', 'free'):
+        registry.register(name, f'{_METHODS}cmd_{name}', 'args')
+    for name in ('clear', 'help'):
+        registry.register(name, f'{_METHODS}cmd_{name}', 'none')
+    registry.register('pwd', f'{_METHODS}cmd_pwd', 'cwd')
+    return registry
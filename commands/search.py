@@ -0,0 +1,454 @@
+import atexit
+import concurrent.futures
+import fnmatch
+import math
+import mmap
+import multiprocessing
+import os
+import queue
+import re
+import signal
+import stat
+import threading
+import time
+from typing import BinaryIO, Callable, Iterator, List, Optional, Sequence, Tuple
+
+WalkBatch = Tuple[str, int, List[os.DirEntry], Optional[OSError]]
+
+class ParallelWalker:
+    """Directory tree walker that runs ``os.scandir`` on a pool of threads.
+
+    Each worker lists one directory at a time and queues its subdirectories
+    for the others, so slow directories (cold caches, network filesystems)
+    are read concurrently. Results are yielded per directory as
+    ``(path, depth, entries, error)`` in whatever order the scans finish.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+
+    def walk(self, root: str, max_depth: Optional[int] = None) -> Iterator[WalkBatch]:
+        """Walk below ``root``; entries of ``root`` itself have depth 1"""
+        work: queue.Queue = queue.Queue()
+        results: queue.Queue = queue.Queue(maxsize=self.workers * 16)
+        cancelled = threading.Event()
+        lock = threading.Lock()
+        pending = [1]
+        done = object()
+
+        def put(item):
+            while not cancelled.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def worker():
+            while True:
+                item = work.get()
+                if item is None or cancelled.is_set():
+                    return
+                path, depth = item
+                try:
+                    with os.scandir(path) as it:
+                        entries = list(it)
+                    error = None
+                except OSError as e:
+                    entries, error = [], e
+                if max_depth is None or depth + 1 < max_depth:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if is_dir:
+                            with lock:
+                                pending[0] += 1
+                            work.put((entry.path, depth + 1))
+                put((path, depth + 1, entries, error))
+                with lock:
+                    pending[0] -= 1
+                    finished = pending[0] == 0
+                if finished:
+                    put(done)
+
+        work.put((root, 0))
+        threads = [threading.Thread(target=worker, name=f"walk-{i}", daemon=True) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    return
+                yield item
+        finally:
+            cancelled.set()
+            for _ in threads:
+                work.put(None)
+
+
+class PathEntry:
+    """DirEntry look-alike for a path given on the command line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path.rstrip(os.sep)) or path
+        self._stat = os.lstat(path)
+
+    def stat(self, follow_symlinks: bool = False) -> os.stat_result:
+        return os.stat(self.path) if follow_symlinks else self._stat
+
+    def is_dir(self, follow_symlinks: bool = False) -> bool:
+        return stat.S_ISDIR(self.stat(follow_symlinks).st_mode)
+
+    def is_file(self, follow_symlinks: bool = False) -> bool:
+        return stat.S_ISREG(self.stat(follow_symlinks).st_mode)
+
+    def is_symlink(self) -> bool:
+        return stat.S_ISLNK(self._stat.st_mode)
+
+Predicate = Callable[[os.DirEntry], bool]
+
+_SIZE_UNITS = {'c': 1, 'w': 2, 'b': 512, 'k': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+FIND_PREDICATES = frozenset({'-name', '-iname', '-type', '-size', '-mtime', '-mmin', '-maxdepth'})
+GREP_FLAGS = 'rRinl'
+
+def find_accepts(args: Sequence[str]) -> bool:
+    """Whether the builtin find implements every predicate in ``args`` (else the system find runs)"""
+    i = 0
+    while i < len(args) and not args[i].startswith('-'):
+        i += 1
+    while i < len(args):
+        if args[i] == '-print':
+            i += 1
+        elif args[i] in FIND_PREDICATES:
+            i += 2
+        else:
+            return False
+    return True
+
+def grep_accepts(args: Sequence[str]) -> bool:
+    """Whether the builtin grep implements every option in ``args`` (else the system grep runs)"""
+    for arg in args:
+        if arg == '--':
+            break
+        if arg.startswith('-') and arg != '-' and set(arg[1:]) - set(GREP_FLAGS):
+            return False
+    return True
+
+def _compare(spec: str, value_of: Callable[[float], float], name: str) -> Callable[[float], bool]:
+    """``+N`` / ``-N`` / ``N`` comparisons as in find(1)"""
+    sign = spec[:1] if spec[:1] in '+-' else ''
+    try:
+        n = int(spec[len(sign):])
+    except ValueError:
+        raise ValueError(f"invalid argument '{spec}' to {name}") from None
+    if sign == '+':
+        return lambda raw: value_of(raw) > n
+    if sign == '-':
+        return lambda raw: value_of(raw) < n
+    return lambda raw: value_of(raw) == n
+
+def parse_find_args(args: Sequence[str]) -> Tuple[List[str], List[Predicate], Optional[int]]:
+    """Split find's arguments into start paths, predicates and -maxdepth"""
+    paths: List[str] = []
+    predicates: List[Predicate] = []
+    max_depth = None
+    now = time.time()
+    i = 0
+    while i < len(args) and not args[i].startswith('-'):
+        paths.append(args[i])
+        i += 1
+    while i < len(args):
+        option = args[i]
+        if option == '-print':
+            i += 1
+            continue  # matches are printed anyway
+        if i + 1 >= len(args):
+            raise ValueError(f"missing argument to '{option}'")
+        value = args[i + 1]
+        i += 2
+        if option == '-name':
+            predicates.append(lambda e, v=value: fnmatch.fnmatchcase(e.name, v))
+        elif option == '-iname':
+            predicates.append(lambda e, v=value.lower(): fnmatch.fnmatchcase(e.name.lower(), v))
+        elif option == '-type':
+            checks = {'f': lambda e: e.is_file(follow_symlinks=False),
+                      'd': lambda e: e.is_dir(follow_symlinks=False),
+                      'l': lambda e: e.is_symlink()}
+            if value not in checks:
+                raise ValueError(f"unknown argument to -type: {value}")
+            predicates.append(checks[value])
+        elif option == '-size':
+            unit = _SIZE_UNITS['b']
+            if value[-1:] in _SIZE_UNITS:
+                unit, value = _SIZE_UNITS[value[-1]], value[:-1]
+            test = _compare(value, lambda size, u=unit: math.ceil(size / u), '-size')
+            predicates.append(lambda e, t=test: t(e.stat(follow_symlinks=False).st_size))
+        elif option in ('-mtime', '-mmin'):
+            period = 86400 if option == '-mtime' else 60
+            test = _compare(value, lambda mtime, p=period: int((now - mtime) // p), option)
+            predicates.append(lambda e, t=test: t(e.stat(follow_symlinks=False).st_mtime))
+        elif option == '-maxdepth':
+            try:
+                max_depth = int(value)
+            except ValueError:
+                raise ValueError(f"invalid argument '{value}' to -maxdepth") from None
+        else:
+            raise ValueError(f"unknown predicate '{option}'")
+    return paths or ['.'], predicates, max_depth
+
+def find(root: str, display_root: str, predicates: List[Predicate], max_depth: Optional[int],
+         write: Callable[[str], None], walker: Optional[ParallelWalker] = None) -> List[str]:
+    """Write matching paths below ``root`` as they are found; returns error messages"""
+    def matches(entry) -> bool:
+        try:
+            return all(predicate(entry) for predicate in predicates)
+        except OSError:
+            return False
+
+    def shown(path: str) -> str:
+        return display_root + path[len(root):]
+
+    errors = []
+    top = PathEntry(root)
+    if matches(top):
+        write(display_root + '\n')
+    if max_depth == 0 or not top.is_dir():
+        return errors
+    for path, depth, entries, error in (walker or ParallelWalker()).walk(root, max_depth):
+        if error is not None:
+            errors.append(f"{shown(path)}: {error.strerror or error}")
+        lines = [shown(entry.path) + '\n' for entry in entries if matches(entry)]
+        if lines:
+            write(''.join(lines))
+    return errors
+
+
+BINARY_SNIFF = 8192
+MMAP_MIN_SIZE = 64 * 1024
+
+def _search_buffer(data, regex, prefix: bytes, list_only: bool, line_numbers: bool) -> bytes:
+    """Matching lines of ``data`` (bytes or mmap), formatted for output.
+
+    The regex runs over the whole buffer, so a hit can span lines (``\s``,
+    ``[^x]``, ``\n``); each hit is confirmed against its own line, which is
+    skipped if it doesn't match there.
+    """
+    out = []
+    pos = 0
+    line_no = 1
+    counted_to = 0
+    size = len(data)
+    while pos <= size:
+        match = regex.search(data, pos)
+        if match is None:
+            break
+        start = data.rfind(b'\n', 0, match.start()) + 1
+        end = data.find(b'\n', match.start())
+        if end < 0:
+            end = size
+        if match.end() > end and regex.search(data[start:end]) is None:
+            pos = end + 1
+            continue
+        if list_only:
+            return prefix.rstrip(b':') + b'\n'
+        if line_numbers:
+            line_no += data[counted_to:start].count(b'\n')
+            counted_to = start
+            out.append(b'%s%d:%s\n' % (prefix, line_no, data[start:end]))
+        else:
+            out.append(prefix + data[start:end] + b'\n')
+        pos = end + 1
+    return b''.join(out)
+
+def search_file(path: str, display: str, regex, with_names: bool, list_only: bool,
+                line_numbers: bool) -> Tuple[bytes, Optional[str]]:
+    """Search one file; returns (output, error). Binary files are skipped."""
+    prefix = display.encode('utf-8', 'surrogateescape') + b':' if with_names or list_only else b''
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(BINARY_SNIFF)
+            if b'\0' in head:
+                return b'', None
+            size = os.fstat(f.fileno()).st_size
+            if size <= len(head):
+                return _search_buffer(head, regex, prefix, list_only, line_numbers), None
+            if size < MMAP_MIN_SIZE:
+                return _search_buffer(head + f.read(), regex, prefix, list_only, line_numbers), None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _search_buffer(data, regex, prefix, list_only, line_numbers), None
+    except IsADirectoryError:
+        return b'', f"{display}: Is a directory"
+    except OSError as e:
+        return b'', f"{display}: {e.strerror or e}"
+
+def _search_batch(batch: List[Tuple[str, str]], pattern: bytes, flags: int, with_names: bool,
+                  list_only: bool, line_numbers: bool) -> Tuple[bytes, List[str]]:
+    """Process-pool entry point: search a batch of files"""
+    regex = _compiled(pattern, flags)
+    output, errors = [], []
+    for path, display in batch:
+        found, error = search_file(path, display, regex, with_names, list_only, line_numbers)
+        if found:
+            output.append(found)
+        if error:
+            errors.append(error)
+    return b''.join(output), errors
+
+_regex_cache = {}
+
+def _compiled(pattern: bytes, flags: int):
+    regex = _regex_cache.get((pattern, flags))
+    if regex is None:
+        regex = _regex_cache[(pattern, flags)] = re.compile(pattern, flags)
+    return regex
+
+def _ignore_sigint():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Shared worker processes, started on first use and kept for later searches.
+
+    Workers come from a fork server (where available) rather than a fork of
+    this multi-threaded process, and ignore SIGINT so Ctrl+C only reaches
+    the terminal, which cancels the search.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _pool = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=context,
+                                                           initializer=_ignore_sigint)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+class GrepEngine:
+    """Content search with byte regexes over mmap'd files.
+
+    Files are searched in this process until ``inline_bytes`` have been
+    seen; beyond that (a big tree or big files) the rest is handed out in
+    batches to a process pool, so the search scales with cores. Results are
+    written as each batch completes. Files with a NUL byte in their first
+    8 KiB are treated as binary and skipped.
+    """
+
+    def __init__(self, pattern: str, ignore_case: bool = False, list_only: bool = False,
+                 line_numbers: bool = False, inline_bytes: int = 32 * 1024 * 1024,
+                 batch_bytes: int = 8 * 1024 * 1024, batch_files: int = 256):
+        self.pattern = pattern.encode('utf-8', 'surrogateescape')
+        self.flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        self.regex = re.compile(self.pattern, self.flags)  # raises re.error for bad patterns
+        self.list_only = list_only
+        self.line_numbers = line_numbers
+        self.inline_bytes = inline_bytes
+        self.batch_bytes = batch_bytes
+        self.batch_files = batch_files
+        self.matched = False
+        self.errors: List[str] = []
+
+    def search_stream(self, stream: BinaryIO, write: Callable[[bytes], None], label: str = '(standard input)'):
+        """Search a non-seekable stream line by line"""
+        for line in stream:
+            if self.regex.search(line, 0, len(line) - 1 if line.endswith(b'\n') else len(line)):
+                self.matched = True
+                if self.list_only:
+                    write(label.encode() + b'\n')
+                    return
+                if not line.endswith(b'\n'):
+                    line += b'\n'
+                write(line)
+
+    def search_files(self, files: Iterator[Tuple[str, str, int]], with_names: bool, write: Callable[[bytes], None]):
+        """Search ``(path, display, size)`` tuples, writing matches as they are found"""
+        inline_budget = self.inline_bytes
+        files = iter(files)
+        for path, display, size in files:
+            found, error = search_file(path, display, self.regex, with_names, self.list_only, self.line_numbers)
+            self._emit(found, [error] if error else [], write)
+            inline_budget -= size
+            if inline_budget <= 0:
+                break
+        else:
+            return
+        self._search_in_pool(files, with_names, write)
+
+    def _emit(self, found: bytes, errors: List[str], write: Callable[[bytes], None]):
+        if found:
+            self.matched = True
+            write(found)
+        self.errors.extend(errors)
+
+    def _search_in_pool(self, files: Iterator[Tuple[str, str, int]], with_names: bool,
+                        write: Callable[[bytes], None]):
+        pool = _get_pool()
+        max_in_flight = (os.cpu_count() or 1) * 4
+        in_flight = set()
+        args = (self.pattern, self.flags, with_names, self.list_only, self.line_numbers)
+
+        def drain(block: bool):
+            done, _ = concurrent.futures.wait(in_flight, timeout=None if block else 0,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                in_flight.discard(future)
+                self._emit(*future.result(), write)
+
+        try:
+            batch, batch_size = [], 0
+            for path, display, size in files:
+                batch.append((path, display))
+                batch_size += size
+                if len(batch) >= self.batch_files or batch_size >= self.batch_bytes:
+                    in_flight.add(pool.submit(_search_batch, batch, *args))
+                    batch, batch_size = [], 0
+                    drain(block=len(in_flight) >= max_in_flight)
+            if batch:
+                in_flight.add(pool.submit(_search_batch, batch, *args))
+            while in_flight:
+                drain(block=True)
+        except concurrent.futures.process.BrokenProcessPool:
+            _discard_pool()
+            raise OSError("grep worker processes died")
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            raise
+
+def grep_files(paths: Sequence[Tuple[str, str]], recursive: bool,
+               walker: Optional[ParallelWalker] = None) -> Iterator[Tuple[str, str, int]]:
+    """``(path, display, size)`` for each file to search; errors come back as size -1"""
+    for path, display in paths:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            yield path, f"{display}: {e.strerror or e}", -1
+            continue
+        if not stat.S_ISDIR(st.st_mode):
+            yield path, display, st.st_size
+            continue
+        if not recursive:
+            yield path, f"{display}: Is a directory", -1
+            continue
+        for directory, _, entries, error in (walker or ParallelWalker()).walk(path):
+            if error is not None:
+                yield directory, f"{display + directory[len(path):]}: {error.strerror or error}", -1
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        yield entry.path, display + entry.path[len(path):], entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
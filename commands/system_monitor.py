@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import deque, namedtuple
+from typing import Deque, Dict, List, Optional
+
+import psutil
+
+from commands.disk_probe import DiskSample, get_disk_probe
+
+ProcessSample = namedtuple('ProcessSample', 'pid name cpu_percent memory_percent status rss')
+SystemSnapshot = namedtuple('SystemSnapshot', 'timestamp cpu_percent per_cpu load_avg memory swap disks processes')
+
+class SystemSampler:
+    """Background sampler of system and per-process statistics.
+
+    A daemon thread takes a snapshot every ``interval`` seconds and keeps the
+    last ``history`` of them in a ring buffer. ``psutil.Process`` objects are
+    reused between samples so ``cpu_percent`` measures the time since the
+    previous sample instead of reading 0.0 on a cold object.
+
+    The thread stops once nobody has asked for a snapshot for ``idle_intervals``
+    intervals, so a single ``ps`` doesn't leave it walking every process for
+    the rest of the session; the next :meth:`latest` starts it again.
+    """
+
+    def __init__(self, interval: float = 2.0, history: int = 30, warmup: float = 0.25,
+                 disk_interval: float = 30.0, idle_intervals: int = 3):
+        self.interval = interval
+        self.warmup = warmup
+        self.disk_interval = disk_interval
+        self.idle_intervals = idle_intervals
+        self._snapshots: Deque[SystemSnapshot] = deque(maxlen=history)
+        self._processes: Dict[int, psutil.Process] = {}
+        self._disks: List[DiskSample] = []
+        self._disks_sampled = 0.0
+        self._ready = threading.Event()
+        self._sample_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._last_used = time.monotonic()
+
+    def start(self):
+        with self._thread_lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            thread = self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+        # Prime the CPU counters so the first real sample covers the warm-up
+        with self._sample_lock:
+            psutil.cpu_percent(None)
+            psutil.cpu_percent(None, percpu=True)
+            self._refresh_processes()
+            for proc in self._processes.values():
+                try:
+                    proc.cpu_percent(None)
+                except psutil.Error:
+                    pass
+        thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        delay = self.warmup
+        while True:
+            stopped = self._stop.wait(delay)
+            if not stopped:
+                try:
+                    self._take_sample()
+                except Exception:
+                    pass
+            delay = self.interval
+            with self._thread_lock:
+                if stopped or time.monotonic() - self._last_used >= self.idle_intervals * self.interval:
+                    # Drop the stale snapshots so a restart waits for a fresh one
+                    self._thread = None
+                    self._ready.clear()
+                    self._snapshots.clear()
+                    return
+
+    def _take_sample(self) -> SystemSnapshot:
+        # The process table is shared, so the sampler thread and callers take turns
+        with self._sample_lock:
+            snapshot = self.sample()
+            self._snapshots.append(snapshot)
+        self._ready.set()
+        return snapshot
+
+    def latest(self, wait: float = 2.0) -> SystemSnapshot:
+        """Most recent snapshot, waiting up to ``wait`` seconds for the first one.
+
+        If the background thread hasn't produced one by then, a sample is
+        taken on the calling thread (errors propagate), so callers never get
+        None.
+        """
+        self._last_used = time.monotonic()
+        self.start()
+        if not self._ready.is_set():
+            self._ready.wait(wait)
+        if self._snapshots:
+            return self._snapshots[-1]
+        return self._take_sample()
+
+    def snapshots(self) -> List[SystemSnapshot]:
+        return list(self._snapshots)
+
+    def _refresh_processes(self):
+        pids = set(psutil.pids())
+        for pid in list(self._processes):
+            if pid not in pids:
+                del self._processes[pid]
+        for pid in pids:
+            if pid not in self._processes:
+                try:
+                    self._processes[pid] = psutil.Process(pid)
+                except psutil.Error:
+                    pass
+
+    def _sample_processes(self) -> List[ProcessSample]:
+        self._refresh_processes()
+        samples = []
+        for pid, proc in list(self._processes.items()):
+            try:
+                with proc.oneshot():
+                    name = proc.name()
+                    cpu = proc.cpu_percent(None)
+                    status = proc.status()
+                    try:
+                        rss = proc.memory_info().rss
+                        mem = proc.memory_percent()
+                    except psutil.AccessDenied:
+                        rss, mem = 0, 0.0
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                self._processes.pop(pid, None)
+                continue
+            except psutil.AccessDenied:
+                continue
+            samples.append(ProcessSample(pid, name, cpu, mem, status, rss))
+        return samples
+
+    def _sample_disks(self) -> List[DiskSample]:
+        now = time.monotonic()
+        if self._disks_sampled and now - self._disks_sampled < self.disk_interval:
+            return self._disks
+        # Concurrent and time-limited, so a hung mount can't stall sampling
+        self._disks = get_disk_probe().samples()
+        self._disks_sampled = now
+        return self._disks
+
+    def sample(self) -> SystemSnapshot:
+        try:
+            load_avg = psutil.getloadavg()
+        except (AttributeError, OSError):
+            load_avg = None
+        return SystemSnapshot(
+            timestamp=time.time(),
+            cpu_percent=psutil.cpu_percent(None),
+            per_cpu=psutil.cpu_percent(None, percpu=True),
+            load_avg=load_avg,
+            memory=psutil.virtual_memory(),
+            swap=psutil.swap_memory(),
+            disks=self._sample_disks(),
+            processes=self._sample_processes(),
+        )
+
+
+_sampler: Optional[SystemSampler] = None
+_sampler_lock = threading.Lock()
+
+def get_sampler() -> SystemSampler:
+    """Shared sampler, started on first use"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = SystemSampler()
+        _sampler.start()
+        return _sampler
@@ -0,0 +1,114 @@
+import heapq
+import os
+import select
+import shutil
+import sys
+import time
+from typing import List, Optional
+
+from commands.system_monitor import SystemSnapshot, get_sampler
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows
+    termios = None
+    tty = None
+
+class LiveTop:
+    """Continuously refreshing process monitor.
+
+    Frames are diffed line by line against the previous frame and only the
+    changed tail of each line is rewritten with ANSI cursor movement, so a
+    refresh costs a few hundred bytes instead of a full screen clear.
+    """
+
+    HEADER_ROWS = 6
+
+    def __init__(self, delay: float = 2.0, count: Optional[int] = None, sort_key: str = 'cpu',
+                 out=None):
+        self.delay = delay
+        self.count = count
+        self.sort_key = sort_key
+        self.out = out or sys.stdout
+        self._previous: List[str] = []
+        self._size = None
+
+    @staticmethod
+    def supported() -> bool:
+        return termios is not None and sys.stdin.isatty() and sys.stdout.isatty()
+
+    def frame(self, snapshot: SystemSnapshot, width: int, height: int) -> List[str]:
+        mem, swap = snapshot.memory, snapshot.swap
+        load = snapshot.load_avg
+        load_text = f"{load[0]:.2f}, {load[1]:.2f}, {load[2]:.2f}" if load else "n/a"
+        per_cpu = '  '.join(f"cpu{i}:{pct:5.1f}" for i, pct in enumerate(snapshot.per_cpu))
+        lines = [
+            f"top - {time.strftime('%H:%M:%S', time.localtime(snapshot.timestamp))}"
+            f"  load average: {load_text}  tasks: {len(snapshot.processes)}  (press any key to quit)",
+            f"%Cpu: {snapshot.cpu_percent:5.1f}",
+            per_cpu,
+            f"Mem: {mem.used // (1024**2)}MB/{mem.total // (1024**2)}MB ({mem.percent}%)"
+            f"   Swap: {swap.used // (1024**2)}MB/{swap.total // (1024**2)}MB ({swap.percent}%)",
+            "",
+            f"{'PID':<8} {'NAME':<25} {'CPU%':>6} {'MEM%':>6} {'RSS(MB)':>9}  {'STATUS'}",
+        ]
+        rows = max(0, height - len(lines) - 1)
+        if self.count is not None:
+            rows = min(rows, self.count)
+        field = 'cpu_percent' if self.sort_key == 'cpu' else 'memory_percent'
+        for proc in heapq.nlargest(rows, snapshot.processes, key=lambda p: getattr(p, field)):
+            lines.append(f"{proc.pid:<8} {proc.name[:25]:<25} {proc.cpu_percent:>6.1f} "
+                         f"{proc.memory_percent:>6.1f} {proc.rss / (1024**2):>9.1f}  {proc.status}")
+        return [line[:width] for line in lines]
+
+    def render(self, lines: List[str]):
+        """Write only the cells that differ from the previous frame"""
+        out = []
+        previous = self._previous
+        for row, line in enumerate(lines):
+            prev = previous[row] if row < len(previous) else None
+            if line == prev:
+                continue
+            col = 0
+            if prev is not None:
+                limit = min(len(line), len(prev))
+                while col < limit and line[col] == prev[col]:
+                    col += 1
+            out.append(f"\x1b[{row + 1};{col + 1}H{line[col:]}\x1b[K")
+        for row in range(len(lines), len(previous)):
+            out.append(f"\x1b[{row + 1};1H\x1b[K")
+        self._previous = lines
+        if out:
+            self.out.write(''.join(out))
+            self.out.flush()
+
+    def run(self):
+        sampler = get_sampler()
+        saved_interval = sampler.interval
+        sampler.interval = min(saved_interval, self.delay)
+        fd = sys.stdin.fileno()
+        saved_mode = termios.tcgetattr(fd)
+        self.out.write("\x1b[?1049h\x1b[?25l\x1b[2J")
+        try:
+            tty.setcbreak(fd)
+            while True:
+                size = shutil.get_terminal_size()
+                if size != self._size:
+                    self._size = size
+                    self._previous = []
+                    self.out.write("\x1b[2J")
+                snapshot = sampler.latest()
+                if snapshot is not None:
+                    self.render(self.frame(snapshot, size.columns, size.lines))
+                readable, _, _ = select.select([fd], [], [], self.delay)
+                if readable:
+                    os.read(fd, 32)
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, saved_mode)
+            self.out.write("\x1b[?25h\x1b[?1049l")
+            self.out.flush()
+            sampler.interval = saved_interval
@@ -1,37 +1,139 @@
 import readline
-import glob
-from typing import Optional, List
+import bisect
+import itertools
+import os
+from typing import Dict, List, Optional, Tuple
+
+DirListing = List[Tuple[str, bool]]
 
 class EnhancedAutoCompleter:
-    """Command and file tab completion"""
-    
-    def __init__(self, terminal_instance):
+    """Command and file tab completion.
+
+    Readline calls :meth:`complete` once per candidate, so candidates are
+    computed when ``state == 0`` (each Tab press) and reused for the rest of
+    that cycle. Directory listings are cached per directory and invalidated
+    when the directory's mtime changes. Directories too big to cache whole
+    keep the capped matches of their last prefix, keyed by device, inode and
+    mtime, so typing further into the same name filters those instead of
+    scanning again.
+    """
+
+    def __init__(self, terminal_instance, max_cached_entries: int = 20000, max_candidates: int = 500):
         self.terminal = terminal_instance
-        self.commands = ['ls', 'cd', 'pwd', 'mkdir', 'rmdir', 'rm', 'cp', 'mv', 'touch', 'cat', 'echo', 'ps', 'top', 'df', 'free', 'history', 'clear', 'help', 'exit']
-    
+        self.commands = terminal_instance.commands.names()
+        self.max_cached_entries = max_cached_entries
+        self.max_candidates = max_candidates
+        self._dir_cache: Dict[str, Tuple[int, DirListing]] = {}
+        # (dev, ino) -> (mtime, prefix, matches, complete) for directories over max_cached_entries
+        self._huge_dirs: Dict[Tuple[int, int], Tuple[int, str, DirListing, bool]] = {}
+        self._cycle_completions: List[str] = []
+
     def complete(self, text: str, state: int) -> Optional[str]:
-        line = readline.get_line_buffer()
-        completions = self.get_completions(text, line)
-        if state < len(completions):
-            return completions[state]
+        if state == 0:
+            self._cycle_completions = self.get_completions(text, readline.get_line_buffer())
+        if state < len(self._cycle_completions):
+            return self._cycle_completions[state]
         return None
-    
+
     def get_completions(self, text: str, line: str) -> List[str]:
-        completions = []
+        completions = set()
 
         # Suggest commands
         if line.strip() == text or line.split()[0] == text:
-            completions.extend([cmd for cmd in self.commands if cmd.startswith(text)])
+            completions.update(cmd for cmd in self.commands if cmd.startswith(text))
             # Add previous commands from history
-            history_suggestions = self.terminal.command_history.get_suggestions(text)
-            completions.extend(history_suggestions)
+            completions.update(self.terminal.command_history.get_suggestions(text))
 
-        # Suggest files/folders
+        # Suggest files/folders relative to the terminal's directory
         try:
-            matches = glob.glob(f"{text}*")
-            completions.extend([m.replace(' ', '\\ ') if ' ' in m else m for m in matches])
-        except Exception:
+            completions.update(self.path_completions(text))
+        except OSError:
             pass
 
-        return sorted(list(set(completions)))
+        return sorted(completions)
+
+    def path_completions(self, text: str) -> List[str]:
+        """Complete ``text`` as a path relative to the terminal's directory"""
+        raw = text.replace('\\ ', ' ')
+        dir_part, prefix = os.path.split(os.path.expanduser(raw))
+        directory = os.path.join(self.terminal.current_dir, dir_part)
+        head = raw[:len(raw) - len(prefix)]
+        show_hidden = prefix.startswith('.')
+
+        matches = []
+        for name, is_dir in self._iter_matches(directory, prefix):
+            if name.startswith('.') and not show_hidden:
+                continue
+            match = head + name + ('/' if is_dir else '')
+            matches.append(match.replace(' ', '\\ '))
+            if len(matches) >= self.max_candidates:
+                break
+        return matches
 
+    def _iter_matches(self, directory: str, prefix: str):
+        st = os.stat(directory)
+        listing = self._listing(directory, st)
+        if listing is not None:
+            start = bisect.bisect_left(listing, (prefix,))
+            return itertools.takewhile(lambda item: item[0].startswith(prefix), itertools.islice(listing, start, None))
+        return self._huge_matches(directory, st, prefix)
+
+    def _listing(self, directory: str, st: os.stat_result) -> Optional[DirListing]:
+        """Cached ``(name, is_dir)`` entries, or None if the directory is too big to cache"""
+        mtime = st.st_mtime_ns
+        cached = self._dir_cache.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        huge = self._huge_dirs.get((st.st_dev, st.st_ino))
+        if huge is not None and huge[0] == mtime:
+            return None
+
+        listing = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                listing.append((entry.name, self._is_dir(entry)))
+                if len(listing) > self.max_cached_entries:
+                    self._dir_cache.pop(directory, None)
+                    self._remember_huge(st, None, [], False)
+                    return None
+        listing.sort()
+        if len(self._dir_cache) >= 64:
+            del self._dir_cache[next(iter(self._dir_cache))]
+        self._dir_cache[directory] = (mtime, listing)
+        return listing
+
+    def _remember_huge(self, st: os.stat_result, prefix: Optional[str], matches: DirListing, complete: bool):
+        key = (st.st_dev, st.st_ino)
+        if key not in self._huge_dirs and len(self._huge_dirs) >= 16:
+            del self._huge_dirs[next(iter(self._huge_dirs))]
+        self._huge_dirs[key] = (st.st_mtime_ns, prefix, matches, complete)
+
+    def _huge_matches(self, directory: str, st: os.stat_result, prefix: str) -> DirListing:
+        """Up to ``max_candidates`` matches in a directory too big to cache whole"""
+        _, cached_prefix, matches, complete = self._huge_dirs[(st.st_dev, st.st_ino)]
+        if cached_prefix is not None:
+            if prefix == cached_prefix:
+                return matches
+            if complete and prefix.startswith(cached_prefix):
+                # Every match of the shorter prefix is here, so filter instead of rescanning
+                return [item for item in matches if item[0].startswith(prefix)]
+
+        matches = []
+        complete = True
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(prefix):
+                    if len(matches) >= self.max_candidates:
+                        complete = False
+                        break
+                    matches.append((entry.name, self._is_dir(entry)))
+        matches.sort()
+        self._remember_huge(st, prefix, matches, complete)
+        return matches
+
+    @staticmethod
+    def _is_dir(entry: os.DirEntry) -> bool:
+        try:
+            return entry.is_dir()
+        except OSError:
+            return False
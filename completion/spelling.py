@@ -0,0 +1,139 @@
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+def damerau_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance (adjacent swaps count as one edit).
+
+    Returns ``max_distance + 1`` as soon as the distance is known to exceed
+    ``max_distance``.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2: Optional[List[int]] = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+def _deletes(word: str, depth: int) -> Set[str]:
+    """Every string reachable from ``word`` by deleting up to ``depth`` characters"""
+    found = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - found
+        found |= frontier
+    return found
+
+class SpellingIndex:
+    """"Did you mean" lookups over command names, SymSpell style.
+
+    Every word is stored under each string obtained by deleting up to
+    ``max_distance`` characters from its first ``prefix_length`` characters.
+    A lookup generates the same deletions of the typo, so candidates come
+    from a few dictionary hits instead of a scan, and only those are checked
+    with :func:`damerau_distance`. Words are added (or their use counted)
+    one at a time, so the index follows the history as it grows. Results
+    are ranked by distance, then by how often the word was used.
+    """
+
+    def __init__(self, max_distance: int = 2, prefix_length: int = 7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._counts: Dict[str, int] = {}
+        self._buckets: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._counts
+
+    def add(self, word: str, count: int = 1):
+        """Add ``word``, or count ``count`` more uses of it"""
+        if word in self._counts:
+            self._counts[word] += count
+            return
+        self._counts[word] = count
+        for key in _deletes(word[:self.prefix_length], self.max_distance):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = {word}
+            else:
+                bucket.add(word)
+
+    def update(self, words: Iterable[str], count: int = 1):
+        for word in words:
+            self.add(word, count)
+
+    def lookup(self, typo: str, limit: int = 5, max_distance: Optional[int] = None) -> List[str]:
+        """Known words within ``max_distance`` edits of ``typo``, best first.
+
+        The default distance is 1 for words of up to three characters, where
+        two edits would match almost anything, and ``self.max_distance``
+        otherwise. ``typo`` itself is never suggested.
+        """
+        if max_distance is None:
+            max_distance = 1 if len(typo) <= 3 else self.max_distance
+        max_distance = min(max_distance, self.max_distance)
+        ranked: List[Tuple[int, int, str]] = []
+        seen = {typo}
+        for key in _deletes(typo[:self.prefix_length], max_distance):
+            for word in self._buckets.get(key, ()):
+                if word in seen:
+                    continue
+                seen.add(word)
+                distance = damerau_distance(typo, word, max_distance)
+                if distance <= max_distance:
+                    ranked.append((distance, -self._counts[word], word))
+        ranked.sort()
+        return [word for _, _, word in ranked[:limit]]
+
+class PathExecutables:
+    """Names of the programs on $PATH, rescanned only when PATH or one of its directories changes"""
+
+    def __init__(self):
+        self._signature: Optional[Tuple] = None
+        self.names: Set[str] = set()
+
+    def _current_signature(self) -> Tuple:
+        directories = [d for d in os.environ.get('PATH', os.defpath).split(os.pathsep) if d]
+        mtimes = []
+        for directory in directories:
+            try:
+                mtimes.append(os.stat(directory).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(directories), tuple(mtimes)
+
+    def refresh(self) -> Set[str]:
+        """Rescan if needed; returns the names that weren't known before"""
+        signature = self._current_signature()
+        if signature == self._signature:
+            return set()
+        self._signature = signature
+        names = set()
+        for directory in signature[0]:
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_file() and os.access(entry.path, os.X_OK):
+                                names.add(entry.name)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        added = names - self.names
+        self.names = names
+        return added
@@ -1,55 +1,258 @@
+import atexit
 import os
-from typing import List
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Deque, List, Optional
+
+from history.history_index import HistoryIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows: sessions don't coordinate compaction
+    fcntl = None
 
 class EnhancedCommandHistory:
-    """Persistent command history with suggestions"""
-    
-    def __init__(self, history_file: str = ".terminal_history"):
+    """Persistent command history with suggestions.
+
+    The history file is an append-only journal: each command costs one small
+    append, fsyncs are batched, and the file is compacted in the background
+    once it grows past ``max_file_bytes``. Only the newest ``max_entries``
+    commands are kept in memory, and they are read lazily from the tail of the
+    file on first access.
+
+    Several sessions can share the file. Appends hold a shared ``flock`` on
+    ``<history file>.lock`` and compaction an exclusive one, so it sees every
+    session's lines. A session whose journal no longer is the file (another
+    one compacted it) reopens it before its next append.
+
+    Searches and suggestions are answered from a :class:`HistoryIndex` that
+    is built on first use, or ahead of it on a background thread with
+    :meth:`build_index`, and then kept in step with the ring buffer.
+
+    With ``persist=False`` the history file is neither read nor written and
+    commands only live in memory, which is what batch runs want.
+    """
+
+    def __init__(self, history_file: str = ".terminal_history", max_entries: int = 10000,
+                 fsync_every: int = 32, fsync_interval: float = 2.0,
+                 max_file_bytes: int = 4 * 1024 * 1024, persist: bool = True):
         self.history_file = os.path.expanduser(f"~/{history_file}")
-        self.commands = []
-        self.load_history()
-    
+        self.max_entries = max_entries
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.max_file_bytes = max_file_bytes
+        self.persist = persist
+
+        self._commands: Optional[Deque[str]] = None
+        self._index: Optional[HistoryIndex] = None
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._indexer: Optional[threading.Thread] = None
+        self._journal = None
+        self._journal_lock = None
+        self._appended = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._compacting = False
+        self._compacted_size = 0
+        if persist:
+            atexit.register(self.close)
+
+    @property
+    def commands(self) -> Deque[str]:
+        """Ring buffer of the most recent commands, loaded on first access"""
+        if self._commands is None:
+            self.load_history()
+        return self._commands
+
+    @property
+    def index(self) -> HistoryIndex:
+        """Search index over the ring buffer, built on first access"""
+        if self._index is None:
+            self._build_index()
+        return self._index
+
+    def build_index(self):
+        """Start building the index on a background thread, so the first search doesn't wait for it"""
+        self.commands
+        if self._index is None and self._indexer is None:
+            self._indexer = threading.Thread(target=self._build_index, name="history-indexer", daemon=True)
+            self._indexer.start()
+
+    def _build_index(self):
+        """Index a snapshot of the ring buffer, then replay the commands added meanwhile"""
+        with self._index_lock:
+            if self._index is not None:
+                return
+            with self._lock:
+                snapshot = list(self.commands)
+                appended = self._appended
+            index = HistoryIndex()
+            index.add_many(snapshot)
+            with self._lock:
+                missed = self._appended - appended
+                if missed:
+                    replay = deque(snapshot, maxlen=self.max_entries)
+                    for command in list(self._commands)[-missed:]:
+                        if len(replay) == replay.maxlen:
+                            index.remove(replay[0])
+                        replay.append(command)
+                        index.add(command)
+                self._index = index
+
     def load_history(self):
-        if os.path.exists(self.history_file):
-            with open(self.history_file, 'r') as f:
-                self.commands = [line.strip() for line in f.readlines()]
-    
+        self._commands = deque(self._read_tail() if self.persist else (), maxlen=self.max_entries)
+        self._index = None
+
+    def _read_tail(self, block_size: int = 64 * 1024) -> List[str]:
+        """Read the last ``max_entries`` lines by seeking backwards from EOF"""
+        try:
+            f = open(self.history_file, 'rb')
+        except OSError:
+            return []
+        with f:
+            pos = f.seek(0, os.SEEK_END)
+            blocks = []
+            newlines = 0
+            while pos > 0 and newlines <= self.max_entries:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                block = f.read(step)
+                blocks.append(block)
+                newlines += block.count(b'\n')
+        data = b''.join(reversed(blocks))
+        lines = data.decode('utf-8', errors='replace').splitlines()
+        if pos > 0:
+            lines = lines[1:]  # first line is probably cut in half
+        commands = [line.strip() for line in lines if line.strip()]
+        return commands[-self.max_entries:]
+
+    def _open_journal(self):
+        """The journal, reopened if compaction replaced the file since it was opened"""
+        journal = self._journal
+        if journal is not None:
+            try:
+                st = os.stat(self.history_file)
+                current = (st.st_dev, st.st_ino)
+            except OSError:
+                current = None
+            opened = os.fstat(journal.fileno())
+            if current != (opened.st_dev, opened.st_ino):
+                journal.close()
+                journal = None
+        if journal is None:
+            journal = self._journal = open(self.history_file, 'ab')
+        return journal
+
+    @staticmethod
+    def _flock(handle, operation: str):
+        """``fcntl.flock`` by operation name (``'LOCK_SH'``, ...); a no-op without fcntl"""
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), getattr(fcntl, operation))
+
+    def _append(self, command: str):
+        """Add ``command`` to the ring buffer, the index and the journal as one step.
+
+        All of it happens under the lock, so an index snapshot always matches
+        ``_appended`` and knows exactly which commands it missed.
+        """
+        line = command.replace('\n', ' ') + '\n'
+        with self._lock:
+            commands = self._commands
+            if self._index is not None:
+                if len(commands) == commands.maxlen:
+                    self._index.remove(commands[0])
+                self._index.add(command)
+            commands.append(command)
+            self._appended += 1
+            if not self.persist:
+                return
+            if self._journal_lock is None:
+                self._journal_lock = open(f"{self.history_file}.lock", 'ab')
+            self._flock(self._journal_lock, 'LOCK_SH')
+            try:
+                journal = self._open_journal()
+                journal.write(line.encode('utf-8'))
+                journal.flush()
+                self._unsynced += 1
+                now = time.monotonic()
+                if self._unsynced >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+                    os.fsync(journal.fileno())
+                    self._unsynced = 0
+                    self._last_sync = now
+                size = journal.tell()
+            finally:
+                self._flock(self._journal_lock, 'LOCK_UN')
+            limit = max(self.max_file_bytes, 2 * self._compacted_size)
+            if size > limit and not self._compacting:
+                self._compacting = True
+                threading.Thread(target=self._compact, name="history-compactor", daemon=True).start()
+
+    def _compact(self):
+        """Rewrite the journal so it only holds its last ``max_entries`` lines.
+
+        The lines come from the file, not the ring buffer, so other sessions'
+        commands survive. The exclusive lock keeps every session from
+        appending until the new file is in place.
+        """
+        tmp_file = f"{self.history_file}.compact"
+        try:
+            with open(f"{self.history_file}.lock", 'ab') as lock:
+                self._flock(lock, 'LOCK_EX')
+                limit = max(self.max_file_bytes, 2 * self._compacted_size)
+                if os.path.getsize(self.history_file) <= limit:
+                    return  # another session compacted it first
+                tail = self._read_tail()
+                with open(tmp_file, 'wb') as f:
+                    f.write(''.join(f"{cmd}\n" for cmd in tail).encode('utf-8'))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    size = f.tell()
+                os.replace(tmp_file, self.history_file)
+                self._compacted_size = size
+        except OSError:
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+        finally:
+            self._compacting = False
+
     def save_history(self):
-        with open(self.history_file, 'w') as f:
-            for cmd in self.commands[-1000:]:
-                f.write(f"{cmd}\n")
-    
+        """Force pending journal writes to disk"""
+        with self._lock:
+            if self._journal is not None and self._unsynced:
+                os.fsync(self._journal.fileno())
+                self._unsynced = 0
+                self._last_sync = time.monotonic()
+
+    def close(self):
+        self.save_history()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self._journal_lock is not None:
+                self._journal_lock.close()
+                self._journal_lock = None
+
     def add_command(self, command: str):
-        if command.strip() and (not self.commands or self.commands[-1] != command):
-            self.commands.append(command)
-            self.save_history()
-    
-    def search_history(self, query: str) -> List[str]:
-        return [cmd for cmd in self.commands if query.lower() in cmd.lower()]
-    
-    def get_suggestions(self, partial_command: str) -> List[str]:
-        suggestions = []
-        for cmd in reversed(self.commands):
-            if cmd.startswith(partial_command) and cmd not in suggestions:
-                suggestions.append(cmd)
-            if len(suggestions) >= 5:
-                break
-        return suggestions
-    def cmd_history(self, args):
-        """Show or search command history"""
-        if args and args[0] == 'search':
-            if len(args) > 1:
-                query = ' '.join(args[1:])
-                results = self.command_history.search_history(query)
-                print(f"🔹 History search results for '{query}':")
-                for i, cmd in enumerate(results, 1):
-                    print(f"{i:4} {cmd}")
-            else:
-                print("Usage: history search <query>")
-        else:
-            # Show last 50 commands by default
-            commands = self.command_history.commands
-            start_idx = max(0, len(commands) - 50)
-            print("🔹 Command history:")
-            for i, cmd in enumerate(commands[start_idx:], start_idx + 1):
-                print(f"{i:4} {cmd}")
+        commands = self.commands
+        if command.strip() and (not commands or commands[-1] != command):
+            self._append(command)
+
+    def recent(self, count: int) -> List[str]:
+        """Return the last ``count`` commands, oldest first"""
+        commands = self.commands
+        return list(islice(commands, max(0, len(commands) - count), None))
+
+    def search_history(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """Distinct commands containing ``query``, most frecent first"""
+        return self.index.search(query, limit)
+
+    def get_suggestions(self, partial_command: str, limit: int = 5) -> List[str]:
+        """Distinct commands starting with ``partial_command``, most frecent first"""
+        return self.index.prefix(partial_command, limit)
@@ -0,0 +1,244 @@
+import heapq
+import math
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+_MAX_CHAR = chr(0x10ffff)
+
+class HistoryIndex:
+    """Sorted command list, frecency ranking and trigram index over history.
+
+    A command's frecency is the sum of ``exp(decay * seq)`` over each of its
+    uses, stored in log space. Every score decays at the same rate, so ranks
+    only move when a command is used, and one list of command ids ordered by
+    score can be kept up to date with a bisect per use.
+
+    A query has a candidate set: the commands in the prefix's range of the
+    sorted list, or those holding the query's rarest trigram. Small sets are
+    ranked directly. Large ones are dense among the best commands, so the
+    ranking is walked from the top until ``limit`` commands match; the walk
+    gives up after as many steps as there are candidates and ranks those
+    instead, so no query costs more than about twice its candidate count.
+
+    Prefixes of up to ``top_depth`` characters, which is what suggestions
+    mostly ask for, also keep their ``top_size`` best ids, filled when the
+    index is built and updated in place on each use, along with the commands
+    they name, so a suggestion is a dict lookup and a slice.
+    """
+
+    def __init__(self, half_life: int = 500, top_size: int = 16, top_depth: int = 8):
+        self.decay = math.log(2) / half_life
+        self.top_size = top_size
+        self.top_depth = top_depth
+        self._ids: Dict[str, int] = {}
+        self._commands: List[Optional[str]] = []
+        self._lowered: List[Optional[str]] = []
+        self._scores: List[float] = []
+        self._counts: List[int] = []
+        self._free_ids: List[int] = []
+        self._grams: Dict[str, Set[int]] = {}
+        self._sorted: List[str] = []  # distinct commands in string order
+        self._rank: List[int] = []  # command ids, lowest score first
+        self._rank_scores: List[float] = []  # scores of _rank, for bisecting
+        self._tops: Dict[str, List[int]] = {}  # short prefix -> best ids, best first
+        self._top_commands: Dict[str, List[str]] = {}  # the commands of _tops, filled as queried
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _score_key(self, command_id: int) -> float:
+        return self._scores[command_id]
+
+    def add(self, command: str):
+        """Record one use of ``command``"""
+        command_id = self._ids.get(command)
+        if command_id is None:
+            command_id = self._insert(command)
+            insort(self._sorted, command)
+        else:
+            self._unrank(command_id)
+        self._record_use(command_id)
+        score = self._scores[command_id]
+        pos = bisect_right(self._rank_scores, score)
+        self._rank.insert(pos, command_id)
+        self._rank_scores.insert(pos, score)
+
+        scores = self._scores
+        for depth in range(min(len(command), self.top_depth) + 1):
+            top = self._tops.get(command[:depth])
+            if top is None:
+                continue  # filled by the next query for it
+            if command_id in top:
+                top.remove(command_id)
+            pos = 0
+            while pos < len(top) and scores[top[pos]] >= score:
+                pos += 1
+            if pos < self.top_size:
+                top.insert(pos, command_id)
+                del top[self.top_size:]
+                self._top_commands.pop(command[:depth], None)
+
+    def add_many(self, commands: Iterable[str]):
+        """Record uses in bulk, then sort and rank all commands once"""
+        for command in commands:
+            command_id = self._ids.get(command)
+            if command_id is None:
+                command_id = self._insert(command)
+            self._record_use(command_id)
+        self._sorted = sorted(self._ids)
+        self._rank = sorted(self._ids.values(), key=self._score_key)
+        self._rank_scores = [self._scores[i] for i in self._rank]
+
+        # Best first, so each top list just takes the first ids that reach it
+        tops = self._tops = {}
+        self._top_commands = {}
+        top_size, top_depth = self.top_size, self.top_depth
+        for command_id in reversed(self._rank):
+            command = self._commands[command_id]
+            for depth in range(min(len(command), top_depth) + 1):
+                top = tops.get(command[:depth])
+                if top is None:
+                    tops[command[:depth]] = [command_id]
+                elif len(top) < top_size:
+                    top.append(command_id)
+
+    def _record_use(self, command_id: int):
+        self._seq += 1
+        weight = self.decay * self._seq
+        score = self._scores[command_id]
+        if score == -math.inf:
+            self._scores[command_id] = weight
+        else:
+            high, low = max(score, weight), min(score, weight)
+            self._scores[command_id] = high + math.log1p(math.exp(low - high))
+        self._counts[command_id] += 1
+
+    def _unrank(self, command_id: int):
+        pos = bisect_left(self._rank_scores, self._scores[command_id])
+        while self._rank[pos] != command_id:
+            pos += 1  # equal scores
+        del self._rank[pos]
+        del self._rank_scores[pos]
+
+    def remove(self, command: str):
+        """Forget one use of ``command``, e.g. when it leaves the ring buffer"""
+        command_id = self._ids.get(command)
+        if command_id is None:
+            return
+        self._counts[command_id] -= 1
+        if self._counts[command_id] > 0:
+            return
+
+        self._unrank(command_id)
+        del self._sorted[bisect_left(self._sorted, command)]
+        for depth in range(min(len(command), self.top_depth) + 1):
+            top = self._tops.get(command[:depth])
+            if top is not None and command_id in top:
+                del self._tops[command[:depth]]  # refilled by the next query for it
+                self._top_commands.pop(command[:depth], None)
+        for gram in self._trigrams(self._lowered[command_id]):
+            ids = self._grams.get(gram)
+            if ids is not None:
+                ids.discard(command_id)
+                if not ids:
+                    del self._grams[gram]
+
+        del self._ids[command]
+        self._commands[command_id] = None
+        self._lowered[command_id] = None
+        self._scores[command_id] = -math.inf
+        self._free_ids.append(command_id)
+
+    def _insert(self, command: str) -> int:
+        """Give ``command`` an id and index its trigrams; the caller sorts and ranks it"""
+        lowered = command.lower()
+        if self._free_ids:
+            command_id = self._free_ids.pop()
+            self._commands[command_id] = command
+            self._lowered[command_id] = lowered
+            self._scores[command_id] = -math.inf
+            self._counts[command_id] = 0
+        else:
+            command_id = len(self._commands)
+            self._commands.append(command)
+            self._lowered.append(lowered)
+            self._scores.append(-math.inf)
+            self._counts.append(0)
+        self._ids[command] = command_id
+
+        grams = self._grams
+        for gram in self._trigrams(lowered):
+            ids = grams.get(gram)
+            if ids is None:
+                grams[gram] = {command_id}
+            else:
+                ids.add(command_id)
+        return command_id
+
+    def _best(self, size: int, candidates: Callable[[], Iterable[int]], test: Callable[[int], bool],
+              limit: Optional[int]) -> List[int]:
+        """Ids of the ``limit`` best commands out of ``size`` candidates that pass ``test``"""
+        rank = self._rank
+        if limit is not None and limit * len(rank) < size * size:
+            found = []
+            for pos in range(len(rank) - 1, max(-1, len(rank) - 1 - size), -1):
+                command_id = rank[pos]
+                if test(command_id):
+                    found.append(command_id)
+                    if len(found) == limit:
+                        return found
+            if len(rank) <= size:
+                return found  # walked everything
+        matches = [i for i in candidates() if test(i)]
+        if limit is None:
+            matches.sort(key=self._score_key, reverse=True)
+            return matches
+        return heapq.nlargest(limit, matches, key=self._score_key)
+
+    def prefix(self, prefix: str, limit: int = 5) -> List[str]:
+        """Best commands starting with ``prefix``, by frecency"""
+        cacheable = len(prefix) <= self.top_depth and limit <= self.top_size
+        if cacheable:
+            commands = self._top_commands.get(prefix)
+            if commands is not None:
+                return commands[:limit]
+            top = self._tops.get(prefix)
+            if top is not None:
+                commands = self._top_commands[prefix] = [self._commands[i] for i in top]
+                return commands[:limit]
+        lo = bisect_left(self._sorted, prefix)
+        hi = bisect_left(self._sorted, prefix + _MAX_CHAR, lo)
+        if lo == hi:
+            return []
+        commands, command_ids = self._commands, self._ids
+        ids = self._best(hi - lo, lambda: (command_ids[c] for c in self._sorted[lo:hi]),
+                         lambda i: commands[i].startswith(prefix), self.top_size if cacheable else limit)
+        if not cacheable:
+            return [commands[i] for i in ids]
+        self._tops[prefix] = ids
+        self._top_commands[prefix] = [commands[i] for i in ids]
+        return self._top_commands[prefix][:limit]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """Commands containing ``query`` (case-insensitive), by frecency"""
+        needle = query.lower()
+        lowered = self._lowered
+        if len(needle) >= 3:
+            postings = []
+            for gram in self._trigrams(needle):
+                ids = self._grams.get(gram)
+                if not ids:
+                    return []
+                postings.append(ids)
+            # A substring match holds every trigram, so the rarest one's ids are enough
+            rarest = min(postings, key=len)
+            candidates, size = (lambda: rarest), len(rarest)
+        else:
+            candidates, size = self._ids.values, len(self._ids)
+        ids = self._best(size, candidates, lambda i: needle in lowered[i], limit)
+        return [self._commands[i] for i in ids]
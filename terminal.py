@@ -1,127 +1,313 @@
 from ai.ai_interpreter import AICommandInterpreter
 from history.command_history import EnhancedCommandHistory
 from completion.auto_completer import EnhancedAutoCompleter
-from commands.core_commands import CommandMethods
-import readline
+from commands.registry import default_registry
+from functools import partial
+import io
 import os
+import shlex
+import shutil
+import sys
+import time
 
-class PythonTerminal:
-    def __init__(self):
-        self.clear_screen()
+# Builtins that draw on the screen, wait on other commands or wrap a whole
+# command line write straight to the terminal instead of through an OutputSink
+DIRECT_OUTPUT = frozenset({'top', 'clear', 'fg', 'bg', 'wait', 'time', 'profile', 'exit', 'quit'})
 
+class PythonTerminal:
+    def __init__(self, interactive=True):
+        self.interactive = interactive
         self.current_dir = os.getcwd()
         self.ai_interpreter = AICommandInterpreter()
-        self.command_history = EnhancedCommandHistory()
-        self.auto_completer = EnhancedAutoCompleter(self)
-        self.setup_readline()
-    
-    # def setup_readline(self):
-    #     readline.set_completer(self.auto_completer.complete)
-    #     readline.parse_and_bind("tab: complete")
+        self.command_history = EnhancedCommandHistory(persist=interactive)
+        self.commands = default_registry()
+        self.commands.register('cd', self._cmd_cd)
+        self.commands.register('history', self._cmd_history)
+        self.commands.register('exit', self._cmd_exit)
+        self.commands.register('quit', self._cmd_exit)
+        for name in ('jobs', 'fg', 'bg', 'wait', 'kill'):
+            self.commands.register(name, partial(self._cmd_job_control, name))
+        self.commands.register('time', self._cmd_time)
+        self.commands.register('profile', self._cmd_profile)
+        self.commands.register('metrics', self._cmd_metrics)
+        self._jobs = None
+        self._speller = None
+        self._path_executables = None
+        self._exit_warned = False
+        # Optional instrumentation; execute_command checks these before anything else
+        self.profiler = None
+        self.metrics = None
+        if interactive:
+            self.auto_completer = EnhancedAutoCompleter(self)
+            self.setup_readline()
+
     def clear_screen(self):
-        os.system('cls' if os.name == 'nt' else 'clear') 
+        from commands.output import CLEAR_SCREEN
+        sys.stdout.write(CLEAR_SCREEN)
+        sys.stdout.flush()
+
     def setup_readline(self):
         try:
+            import readline
             readline.set_completer(self.auto_completer.complete)
             readline.parse_and_bind("tab: complete")
             readline.set_completer_delims(' \t\n=')
             # Load last 100 commands into readline
-            for cmd in self.command_history.commands[-100:]:
+            for cmd in self.command_history.recent(100):
                 readline.add_history(cmd)
         except ImportError:
             print("⚠️ Readline not available - auto-completion disabled")
 
-    
+    @property
+    def jobs(self):
+        """Background job manager, started on first use"""
+        if self._jobs is None:
+            from commands.jobs import JobManager
+            self._jobs = JobManager(self.is_builtin, self._run_builtin)
+        return self._jobs
+
+    @property
+    def speller(self):
+        """Did-you-mean index over builtins, PATH programs and history, built on first use"""
+        from completion.spelling import PathExecutables, SpellingIndex
+        if self._speller is None:
+            from collections import Counter
+            speller = SpellingIndex()
+            speller.update(self.commands.names())
+            self._path_executables = PathExecutables()
+            speller.update(self._path_executables.refresh())
+            for word, count in Counter(cmd.split(None, 1)[0] for cmd in self.command_history.commands
+                                       if cmd.strip()).items():
+                # A one-off word may well be a typo itself; repeated or known ones are not
+                if count > 1 or word in speller:
+                    speller.add(word, count)
+            self._speller = speller
+        else:
+            self._speller.update(self._path_executables.refresh())
+        return self._speller
+
+    def is_builtin(self, name, args=None):
+        """Whether ``name`` runs as a builtin; given ``args`` it doesn't support, a
+        program of the same name on PATH runs instead"""
+        if name not in self.commands:
+            return False
+        return args is None or self.commands.accepts(name, args) or shutil.which(name) is None
+
     def execute_command(self, command):
+        """Run one command line and return its exit status"""
         if not command.strip():
-            return
+            return 0
 
         # Add to history
         self.command_history.add_command(command)
 
-        parts = command.strip().split()
-        cmd = parts[0].lower() if parts else ""
+        if self.profiler is None and self.metrics is None:
+            status = self._dispatch(command)
+        else:
+            status = self._run_instrumented(command)
+        if self._speller is not None and status != 127:
+            self._speller.add(command.split(None, 1)[0])
+        return status
+
+    def _run_instrumented(self, command):
+        name = command.split(None, 1)[0]
+        start = time.perf_counter()
+        if self.profiler is not None:
+            status = self.profiler.run(name, lambda: self._dispatch(command))
+        else:
+            status = self._dispatch(command)
+        if self.metrics is not None:
+            self.metrics.record(name, time.perf_counter() - start, status)
+        return status
+
+    def _dispatch(self, command):
+        # "time" covers the whole pipeline that follows it, as in sh
+        stripped = command.lstrip()
+        if stripped.startswith('time') and stripped[4:5].isspace():
+            return self._time(stripped[5:])
+
+        from commands.pipeline import parse_pipeline, split_background
+        command, background = split_background(command)
+        try:
+            stages = parse_pipeline(command)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 2
+        if not stages:
+            return 0
 
         # Check built-in first
-        if cmd in ['exit', 'quit', 'pwd', 'ls', 'cd', 'mkdir', 'rmdir', 'rm', 'touch', 'cat', 'cp', 'mv', 'echo', 'ps', 'top', 'df', 'free', 'history', 'clear', 'help']:
-            self._execute_single_command(command)
-            return
-
-        # Otherwise, treat as natural language
-        if self.ai_interpreter.is_natural_language_query(command):
-            print(f"🤖 Interpreting: {command}")
-            cmds = self.ai_interpreter.interpret_natural_language(command)
-            if cmds:
-                for c in cmds:
-                    self._execute_single_command(c)
-            else:
-                print(f"❌ Sorry, I couldn't understand: '{command}'")
-                print("💡 Try: 'create a folder called test' or 'ls'")
+        argv = stages[0].argv
+        if len(stages) == 1 and not stages[0].redirected and not background:
+            if self.is_builtin(argv[0], argv[1:]):
+                return self._run_builtin(argv) or 0
 
+            # Natural language, unless the first word is a program that isn't a query verb
+            first_word = argv[0].lower()
+            if self.ai_interpreter.is_natural_language_query(command) and (
+                    first_word in self.ai_interpreter.nl_indicators or shutil.which(argv[0]) is None):
+                cmds = self.ai_interpreter.interpret_natural_language(command)
+                if cmds:
+                    print(f"🤖 Interpreting: {command}")
+                    status = 0
+                    for c in cmds:
+                        status = self._execute_single_command(c)
+                    return status
+                if shutil.which(argv[0]) is None:
+                    print(f"❌ Sorry, I couldn't understand: '{command}'")
+                    print("💡 Try: 'create a folder called test' or 'ls'")
+                    return 1
+
+        from commands.pipeline import PipelineRunner, exit_status
+        missing = PipelineRunner.find_missing(stages, self.is_builtin)
+        if missing is not None:
+            self._report_unknown(missing)
+            return 127
+        if background:
+            self.jobs.submit(command, stages, self.current_dir)
+            return 0
+        return exit_status(PipelineRunner(self.is_builtin, self._run_builtin, self.current_dir).run(stages))
 
-    
     def _execute_single_command(self, command):
-        parts = command.strip().split()
+        try:
+            parts = shlex.split(command)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 2
         if not parts:
-            return
-        cmd, args = parts[0], parts[1:]
-
-        # Built-in commands
-        if cmd == 'pwd':
-            CommandMethods.cmd_pwd(self.current_dir)
-        elif cmd == 'ls':
-            CommandMethods.cmd_ls(self.current_dir, args)
-        elif cmd == 'cd':
-            CommandMethods.cmd_cd(self.current_dir, args)  # fixed: was cmd_touch, should be cmd_cd
-        elif cmd == 'mkdir':
-            CommandMethods.cmd_mkdir(self.current_dir, args)
-        elif cmd == 'rm':
-            CommandMethods.cmd_rm(self.current_dir, args)
-        elif cmd == 'cat':
-            CommandMethods.cmd_cat(self.current_dir, args)
-        elif cmd == 'cp':
-            CommandMethods.cmd_cp(self.current_dir, args)
-        elif cmd == 'mv':
-            CommandMethods.cmd_mv(self.current_dir, args)
-        elif cmd == 'echo':
-            CommandMethods.cmd_echo(args)
-        elif cmd == 'ps':
-            CommandMethods.cmd_ps(args)
-        elif cmd == 'top':
-            CommandMethods.cmd_top()
-        elif cmd == 'df':
-            CommandMethods.cmd_df()
-        elif cmd == 'free':
-            CommandMethods.cmd_free()
-        elif cmd == 'history':
-            CommandMethods.cmd_history(args)
-        elif cmd == 'clear':
-            CommandMethods.cmd_clear()
-        elif cmd == 'help':
-            CommandMethods.cmd_help()
-        elif cmd in ['exit', 'quit']:
-            print("👋 Goodbye!")
-            exit(0)
+            return 0
+        if self.is_builtin(parts[0]):
+            return self._run_builtin(parts) or 0
+        self._report_unknown(parts[0])
+        return 127
+
+    def _run_builtin(self, argv):
+        handler = self.commands.get(argv[0])
+        if handler is None:
+            return None
+        if argv[0] in DIRECT_OUTPUT or (argv[0] == 'tail' and '-f' in argv):
+            return handler(self, argv[1:])
+        from commands.output import output_sink
+        with output_sink(page=self.interactive):
+            return handler(self, argv[1:])
+
+    def _cmd_cd(self, terminal, args):
+        from commands.core_commands import CommandMethods
+        target = os.path.join(self.current_dir, args[0]) if args else os.path.expanduser('~')
+        self.current_dir = CommandMethods.cmd_cd(self.current_dir, args)
+        return 0 if os.path.isdir(target) else 1
+
+    def _cmd_history(self, terminal, args):
+        from commands.core_commands import CommandMethods
+        return CommandMethods.cmd_history(self.command_history, args)
+
+    def _time(self, command):
+        from commands.instrumentation import time_call
+        status, report = time_call(lambda: self._dispatch(command))
+        sys.stdout.flush()
+        print(report.format(), file=sys.stderr)
+        return status
 
+    def _cmd_time(self, terminal, args):
+        if not args:
+            print("Usage: time <command>")
+            return 2
+        return self._time(shlex.join(args))
+
+    def _cmd_profile(self, terminal, args):
+        """profile on [DIR] | off | status"""
+        action = args[0] if args else 'status'
+        if action == 'on':
+            from commands.instrumentation import CommandProfiler
+            try:
+                self.profiler = CommandProfiler(*args[1:2])
+            except OSError as e:
+                print(f"profile: {e}")
+                return 1
+            print(f"📊 Profiling every command; stats are saved in {self.profiler.directory}")
+        elif action == 'off':
+            self.profiler = None
+            print("📊 Profiling off")
+        elif action == 'status':
+            print(f"📊 Profiling {'on (' + self.profiler.directory + ')' if self.profiler else 'off'}")
         else:
-            # Unknown command: suggestions
-            print(f"❌ Unknown command: {cmd}")
-            
-            # Suggest built-in commands starting with same letters
-            suggestions = [c for c in self.auto_completer.commands if c.startswith(cmd)]
-            if suggestions:
-                print("💡 Did you mean:")
-                for s in suggestions[:5]:  # show max 5 suggestions
-                    print(f"   • {s}")
-
-            # Suggest recent history commands
-            history_suggestions = [h for h in reversed(self.command_history.commands) if h.startswith(cmd)]
-            if history_suggestions:
-                print("🕘 Recently used similar commands:")
-                for s in history_suggestions[:5]:
-                    print(f"   • {s}")
-
-            print("📌 Type 'help' to see all available commands")
+            print("Usage: profile on [DIR] | off | status")
+            return 2
+        return 0
+
+    def _cmd_metrics(self, terminal, args):
+        """metrics on FILE | off | show"""
+        action = args[0] if args else 'show'
+        if action == 'on' and len(args) > 1:
+            from commands.instrumentation import MetricsSink
+            if self.metrics is not None:
+                self.metrics.close()
+            try:
+                self.metrics = MetricsSink(args[1])
+            except ValueError as e:
+                print(f"metrics: {e}")
+                return 1
+            print(f"📈 Recording command latency to {self.metrics.path} ({self.metrics.format})")
+        elif action == 'off':
+            if self.metrics is not None:
+                self.metrics.close()
+            self.metrics = None
+            print("📈 Metrics off")
+        elif action == 'show':
+            if self.metrics is None:
+                print("📈 Metrics off (turn on with: metrics on FILE.jsonl|FILE.prom)")
+                return 0
+            print(f"📈 {self.metrics.path} ({self.metrics.format})")
+            print(f"{'COMMAND':<16} {'COUNT':>7} {'FAIL':>5} {'MEAN':>9} {'P50 ≤':>8} {'P95 ≤':>8}")
+            for name, histogram in sorted(self.metrics.totals.items(), key=lambda item: -item[1].count):
+                mean = histogram.total / histogram.count
+                print(f"{name:<16} {histogram.count:>7} {histogram.failures:>5} {mean * 1000:>7.1f}ms "
+                      f"{histogram.quantile(0.5):>7}s {histogram.quantile(0.95):>7}s")
+        else:
+            print("Usage: metrics on FILE | off | show")
+            return 2
+        return 0
+
+    def _cmd_job_control(self, name, terminal, args):
+        from commands.core_commands import CommandMethods
+        return getattr(CommandMethods, f"cmd_{name}")(self.jobs, args)
+
+    def _cmd_exit(self, terminal, args):
+        try:
+            status = int(args[0]) if args else 0
+        except ValueError:
+            print(f"exit: {args[0]}: numeric argument required")
+            status = 2
+        if self.interactive:
+            running = self._jobs is not None and any(not job.done for job in self._jobs.jobs())
+            if running and not self._exit_warned:
+                self._exit_warned = True
+                print("⚠️ There are running jobs; 'exit' again to quit and stop them")
+                return 1
+            print("👋 Goodbye!")
+        sys.exit(status)
+
+    def _report_unknown(self, cmd):
+        # Unknown command: suggestions
+        print(f"❌ Unknown command: {cmd}")
+
+        # Builtins the typed word is a prefix of, then close misspellings
+        suggestions = [c for c in self.commands.names() if c.startswith(cmd)]
+        suggestions += [c for c in self.speller.lookup(cmd) if c not in suggestions]
+        suggestions = suggestions[:5]
+        if suggestions:
+            print("💡 Did you mean:")
+            for s in suggestions:
+                print(f"   • {s}")
+
+        # Suggest recent history commands
+        history_suggestions = self.command_history.get_suggestions(cmd)
+        if history_suggestions:
+            print("🕘 Recently used similar commands:")
+            for s in history_suggestions[:5]:
+                print(f"   • {s}")
+
+        print("📌 Type 'help' to see all available commands")
 
     
     def get_prompt(self):
@@ -135,14 +321,102 @@ class PythonTerminal:
         print("🖥️ System commands: show running processes, display system information")
         print("💡 Tip: Try 'create a folder called test' or 'make a file named example.txt'")
         print("Type 'exit' or press Ctrl+D to quit.")
+        self.command_history.build_index()
 
         while True:
             try:
+                if self._jobs is not None:
+                    self._jobs.notify()
                 command = input(self.get_prompt())
                 self.execute_command(command)
             except (KeyboardInterrupt, EOFError):
                 print("\nGoodbye!")
                 break
+
+    def run_script(self, lines, errexit=False):
+        """Run commands from an iterable of lines; returns the last exit status.
+
+        Blank lines and ``#`` comments are skipped. With ``errexit`` the run
+        stops at the first command that fails, like ``sh -e``. Background
+        jobs still running at the end are waited for.
+        """
+        status = 0
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                status = self.execute_command(line)
+            except KeyboardInterrupt:
+                return 130
+            if self._jobs is not None:
+                self._jobs.notify()
+            if status and errexit:
+                break
+        if self._jobs is not None:
+            # Builtin jobs are threads of this process; let them finish
+            self._jobs.wait()
+            self._jobs.notify()
+        return status
+
+def _batch_stdout(buffer_size=1024 * 1024):
+    """Block-buffered stdout for batch runs; unchanged when it is a terminal"""
+    if sys.stdout.isatty():
+        return sys.stdout
+    sys.stdout.flush()
+    raw = io.FileIO(sys.stdout.fileno(), 'w', closefd=False)
+    return io.TextIOWrapper(io.BufferedWriter(raw, buffer_size), encoding='utf-8', errors='replace')
+
+def main(argv=None):
+    """Entry point: interactive shell, or batch mode for ``-c``, a script file or piped stdin"""
+    import argparse
+    parser = argparse.ArgumentParser(prog='terminal.py', description="PythonTerminal")
+    parser.add_argument('-c', dest='command', metavar='COMMANDS',
+                        help="run COMMANDS (one per line) and exit")
+    parser.add_argument('-e', dest='errexit', action='store_true',
+                        help="stop at the first command that fails")
+    parser.add_argument('--profile', action='store_true',
+                        help="profile every command with cProfile (same as 'profile on')")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="record command latency histograms to FILE (.jsonl, or .prom for Prometheus)")
+    parser.add_argument('script', nargs='?', help="file of commands to run ('-' for stdin)")
+    options = parser.parse_args(argv)
+
+    interactive = options.command is None and options.script is None and sys.stdin.isatty()
+    if not interactive:
+        sys.stdout = _batch_stdout()
+    terminal = PythonTerminal(interactive=interactive)
+    if options.profile or options.metrics:
+        from commands.instrumentation import CommandProfiler, MetricsSink
+        try:
+            terminal.profiler = CommandProfiler() if options.profile else None
+            terminal.metrics = MetricsSink(options.metrics) if options.metrics else None
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    if interactive:
+        terminal.run()
+        return 0
+
+    try:
+        if options.command is not None:
+            return terminal.run_script(options.command.splitlines(), options.errexit)
+        if options.script in (None, '-'):
+            return terminal.run_script(sys.stdin, options.errexit)
+        try:
+            with open(options.script, encoding='utf-8') as f:
+                return terminal.run_script(f, options.errexit)
+        except OSError as e:
+            print(f"terminal.py: {options.script}: {e.strerror or e}", file=sys.stderr)
+            return 127
+    except BrokenPipeError:
+        # Reader went away (e.g. "| head"); discard what's left
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 141
+    finally:
+        try:
+            sys.stdout.flush()
+        except BrokenPipeError:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
 if __name__ == '__main__':
-    terminal = PythonTerminal()
-    terminal.run()
+    sys.exit(main())